@@ -1,36 +1,317 @@
 # abac.py
 # ABAC engine using Policy model from database with organization-based access
-from app.models import Policy
+#
+# Policy lookups are cached at two levels:
+#   1. per request  - a dict in a context variable, reset for every request
+#                     by app.middleware.ABACRequestCacheMiddleware
+#   2. per cluster  - Django's cache framework (shared by web and workers)
+# Both are invalidated from app.signals when a Policy or a user's
+# organization membership changes.
+#
+# The second level needs a cache every process shares (Redis, REDIS_URL):
+# invalidations of a process-local cache (LocMemCache) would only reach
+# the process that made the change, and the others would keep granting a
+# revoked permission. With such a backend shared_cache_enabled() is False
+# and only the per-request level is used (see also app.checks).
+#
+# A policy is cached as its compiled permission_bits integer, so every
+# check is a single bitwise AND against ACTION_BITS.
+#
+# Organization memberships are cached as frozensets under a per-user
+# version number; a membership change bumps the version instead of
+# deleting the entry, so a reader racing the change can only repopulate a
+# key nobody will read again.
+#
+# Every invalidation also bumps the user's policy stamp (policy_stamp()),
+# which app.etags turns into ETags for /me/, /my-features/ and
+# /user-permissions/.
+import threading
+import time
+from contextvars import ContextVar
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
 
-# action: 'upload', 'read', 'delete', etc.
-# resource: optional dict with resource attributes like {'organization': org_id, 'user_id': user_id}
-def validate_permissions(user, action, resource=None):
-    
-    try:
-        policy = Policy.objects.get(user=user)
-    except Policy.DoesNotExist:
-        return False
+from app.models import POLICY_PERMISSION_BITS, Policy, User
 
-    # Check basic permissions
-    if action == "upload":
-        permission = policy.can_upload
-    elif action == "read":
-        permission = policy.can_read
-    elif action == "delete":
-        permission = policy.can_delete
-    elif action == "read_all_files":
-        permission = getattr(policy, "can_read_all_files", False)
-    elif action == "add_user":
-        permission = getattr(policy, "can_add_user", False)
-    elif action == "delete_user":
-        permission = getattr(policy, "can_delete_user", False)
-    elif action == "set_permissions":
-        permission = getattr(policy, "can_set_permissions", False)
+
+# Policy fields, in the order get_user_permissions() reports them
+PERMISSION_FIELDS = tuple(POLICY_PERMISSION_BITS)
+
+# action -> Policy field
+ACTION_FIELDS = {
+    "upload": "can_upload",
+    "read": "can_read",
+    "delete": "can_delete",
+    "read_all_files": "can_read_all_files",
+    "add_user": "can_add_user",
+    "delete_user": "can_delete_user",
+    "set_permissions": "can_set_permissions",
+}
+
+# action -> bit in Policy.permission_bits
+ACTION_BITS = {action: POLICY_PERMISSION_BITS[field] for action, field in ACTION_FIELDS.items()}
+
+POLICY_CACHE_TIMEOUT = getattr(settings, "ABAC_POLICY_CACHE_TIMEOUT", 300)
+
+# Cache backends whose entries only live in one process
+PROCESS_LOCAL_CACHE_BACKENDS = frozenset({
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+})
+
+_request_cache = ContextVar("abac_request_cache", default=None)
+
+_stats_lock = threading.Lock()
+_stats = {
+    name: {"request_hits": 0, "cache_hits": 0, "misses": 0, "invalidations": 0}
+    for name in ("policy", "organizations")
+}
+
+
+def _count(cache_name, counter):
+    with _stats_lock:
+        _stats[cache_name][counter] += 1
+
+
+def cache_stats():
+    """Hit/miss counters of the ABAC caches in this process."""
+    report = {}
+    with _stats_lock:
+        for name, counters in _stats.items():
+            stats = dict(counters)
+            hits = stats["request_hits"] + stats["cache_hits"]
+            lookups = hits + stats["misses"]
+            stats["hit_ratio"] = round(hits / lookups, 4) if lookups else None
+            report[name] = stats
+    return report
+
+
+def shared_cache_enabled():
+    """
+    Whether authorization data may be kept in Django's cache across
+    requests. ETL_SHARED_CACHE overrides the detection; by default the
+    cache counts as shared unless its backend is process-local.
+    """
+    configured = getattr(settings, "ETL_SHARED_CACHE", None)
+    if configured is not None:
+        return bool(configured)
+    return settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHE_BACKENDS
+
+
+def start_request_cache():
+    """Begin a fresh per-request cache; returns a token for end_request_cache."""
+    return _request_cache.set({})
+
+
+def end_request_cache(token):
+    _request_cache.reset(token)
+
+
+def request_cached(key, load):
+    """
+    Return load(), memoized in the current request's cache under `key` (a
+    tuple tagged with what it holds). Outside a request, load() is called.
+    """
+    request_cache = _request_cache.get()
+    if request_cache is None:
+        return load()
+    if key not in request_cache:
+        request_cache[key] = load()
+    return request_cache[key]
+
+
+def _policy_key(user_id):
+    return f"abac:policy-bits:{user_id}"
+
+
+def _load_policy_bits(user_id):
+    bits = Policy.objects.filter(user_id=user_id).values_list("permission_bits", flat=True).first()
+    return bits or 0
+
+
+def get_policy_bits(user):
+    """
+    Compiled permission bits of `user`, from the request cache, then the
+    shared cache, then the database.
+    """
+    if not getattr(user, "id", None):
+        return 0
+
+    request_cache = _request_cache.get()
+    if request_cache is not None and ("policy", user.id) in request_cache:
+        _count("policy", "request_hits")
+        return request_cache[("policy", user.id)]
+
+    shared = shared_cache_enabled()
+    bits = cache.get(_policy_key(user.id)) if shared else None
+    if bits is not None:
+        _count("policy", "cache_hits")
+    else:
+        _count("policy", "misses")
+        bits = _load_policy_bits(user.id)
+        if shared:
+            cache.set(_policy_key(user.id), bits, POLICY_CACHE_TIMEOUT)
+
+    if request_cache is not None:
+        request_cache[("policy", user.id)] = bits
+    return bits
+
+
+def permission_mask(*actions):
+    """OR of the bits of `actions`; raises ValueError for an unknown action."""
+    mask = 0
+    for action in actions:
+        try:
+            mask |= ACTION_BITS[action]
+        except KeyError:
+            raise ValueError(f"Unknown action '{action}'.")
+    return mask
+
+
+def users_with_permissions(*actions, queryset=None):
+    """
+    Users whose policy grants every one of `actions`, filtered in SQL with
+    a bitwise AND on Policy.permission_bits (no per-user policy loads).
+    """
+    mask = permission_mask(*actions)
+    queryset = User.objects.all() if queryset is None else queryset
+    return queryset.alias(
+        granted_bits=F("policy__permission_bits").bitand(mask)
+    ).filter(granted_bits=mask)
+
+
+def invalidate_policy(*user_ids):
+    """Forget cached policies of the given users (both cache levels)."""
+    keys = [_policy_key(user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    if transaction.get_connection().in_atomic_block:
+        # A concurrent request may re-cache the old row before we commit
+        transaction.on_commit(lambda: cache.delete_many(keys))
+    request_cache = _request_cache.get()
+    if request_cache is not None:
+        for user_id in user_ids:
+            request_cache.pop(("policy", user_id), None)
+    _count("policy", "invalidations")
+    bump_policy_stamp(*user_ids)
+
+
+def _org_version_key(user_id):
+    return f"abac:orgs-version:{user_id}"
+
+
+def _org_version(user_id):
+    version = cache.get(_org_version_key(user_id))
+    if version is None:
+        # Start from the clock so an evicted counter never reuses an old key
+        cache.add(_org_version_key(user_id), time.time_ns(), None)
+        version = cache.get(_org_version_key(user_id))
+    return version
+
+
+def get_org_ids(user):
+    """
+    Ids of the organizations `user` belongs to, as a frozenset. Served from
+    the request cache or the versioned shared cache without a query.
+    """
+    if not getattr(user, "id", None):
+        return frozenset()
+
+    request_cache = _request_cache.get()
+    if request_cache is not None and ("orgs", user.id) in request_cache:
+        _count("organizations", "request_hits")
+        return request_cache[("orgs", user.id)]
+
+    key = org_ids = None
+    if shared_cache_enabled():
+        key = f"abac:orgs:{user.id}:v{_org_version(user.id)}"
+        org_ids = cache.get(key)
+    if org_ids is not None:
+        _count("organizations", "cache_hits")
     else:
+        _count("organizations", "misses")
+        org_ids = frozenset(user.organizations.values_list("id", flat=True))
+        if key is not None:
+            cache.set(key, org_ids, POLICY_CACHE_TIMEOUT)
+
+    if request_cache is not None:
+        request_cache[("orgs", user.id)] = org_ids
+    return org_ids
+
+
+def _bump_org_versions(user_ids):
+    for user_id in user_ids:
+        try:
+            cache.incr(_org_version_key(user_id))
+        except ValueError:
+            # No version yet: nothing cached under the old one either
+            pass
+
+
+def invalidate_org_ids(*user_ids):
+    """Move the given users to a new membership version."""
+    _bump_org_versions(user_ids)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump_org_versions(user_ids))
+    request_cache = _request_cache.get()
+    if request_cache is not None:
+        for user_id in user_ids:
+            request_cache.pop(("orgs", user_id), None)
+    _count("organizations", "invalidations")
+    bump_policy_stamp(*user_ids)
+
+
+def _policy_stamp_key(user_id):
+    return f"abac:policy-stamp:{user_id}"
+
+
+def policy_stamp(user):
+    """
+    Opaque version of everything ABAC knows about `user` (policy,
+    memberships, user row). It changes whenever one of them does, so
+    responses derived from them can be revalidated with one cache read.
+
+    Returns None (no conditional GETs) without a shared cache: a bump in
+    a process-local cache would only reach the process that made it.
+    Stamps also expire with the policy cache, so one lost bump cannot
+    keep a response fresh for longer than a cached policy lives.
+    """
+    if not getattr(user, "id", None) or not shared_cache_enabled():
+        return None
+    key = _policy_stamp_key(user.id)
+    stamp = cache.get(key)
+    if stamp is None:
+        # From the clock, so a stamp dropped by a bump (or expired) is never reused
+        cache.add(key, time.time_ns(), POLICY_CACHE_TIMEOUT)
+        stamp = cache.get(key)
+    return stamp
+
+
+def _drop_policy_stamps(user_ids):
+    cache.delete_many([_policy_stamp_key(user_id) for user_id in user_ids])
+
+
+def bump_policy_stamp(*user_ids):
+    """Give the given users a new policy stamp (on their next read)."""
+    _drop_policy_stamps(user_ids)
+    if transaction.get_connection().in_atomic_block:
+        # A reader may stamp the old rows again before we commit
+        transaction.on_commit(lambda: _drop_policy_stamps(user_ids))
+
+
+def _decide(user, bits, org_ids, action, resource):
+    """
+    One ABAC decision from preloaded data. `org_ids` is a callable so the
+    membership set is only loaded when a resource asks for it.
+    """
+    bit = ACTION_BITS.get(action)
+    if bit is None:
         return False
 
-    if not permission:
+    # Check basic permissions
+    if not bits & bit:
         return False
 
     # Organization-based access control
@@ -38,20 +319,54 @@ def validate_permissions(user, action, resource=None):
         # Check organization access for resources
         if 'organization' in resource:
             # User can only access resources in their organizations
-            user_org_ids = list(user.organizations.values_list('id', flat=True))
-            if resource['organization'] not in user_org_ids:
+            if resource['organization'] not in org_ids():
                 return False
 
         # Check user-specific access (e.g., for permission assignment)
         if 'target_user_id' in resource:
             target_user_id = resource['target_user_id']
             # Only allow managers to modify other users' permissions
-            if target_user_id != user.id and not getattr(policy, "can_set_permissions", False):
+            if target_user_id != user.id and not bits & ACTION_BITS["set_permissions"]:
                 return False
 
     return True
 
 
+# action: 'upload', 'read', 'delete', etc.
+# resource: optional dict with resource attributes like {'organization': org_id, 'user_id': user_id}
+def validate_permissions(user, action, resource=None):
+    if action not in ACTION_BITS:
+        return False
+    return _decide(user, get_policy_bits(user), lambda: get_org_ids(user), action, resource)
+
+
+def evaluate_permissions(user, checks):
+    """
+    Answer many permission checks for one user with one policy load and at
+    most one membership load.
+
+    Args:
+        user: User instance
+        checks: iterable of action strings or (action, resource) pairs
+
+    Returns:
+        list of bools, in the order of `checks`
+    """
+    bits = get_policy_bits(user)
+    memberships = []
+
+    def org_ids():
+        if not memberships:
+            memberships.append(get_org_ids(user))
+        return memberships[0]
+
+    results = []
+    for check in checks:
+        action, resource = (check, None) if isinstance(check, str) else check
+        results.append(_decide(user, bits, org_ids, action, resource))
+    return results
+
+
 def get_user_permissions(user):
     """
     Get all permissions for a user as a dictionary.
@@ -62,24 +377,5 @@ def get_user_permissions(user):
     Returns:
         dict: Dictionary of user permissions
     """
-    try:
-        policy = Policy.objects.get(user=user)
-        return {
-            'can_upload': policy.can_upload,
-            'can_read': policy.can_read,
-            'can_delete': policy.can_delete,
-            'can_read_all_files': getattr(policy, "can_read_all_files", False),
-            'can_add_user': getattr(policy, "can_add_user", False),
-            'can_delete_user': getattr(policy, "can_delete_user", False),
-            'can_set_permissions': getattr(policy, "can_set_permissions", False),
-        }
-    except Policy.DoesNotExist:
-        return {
-            'can_upload': False,
-            'can_read': False,
-            'can_delete': False,
-            'can_read_all_files': False,
-            'can_add_user': False,
-            'can_delete_user': False,
-            'can_set_permissions': False,
-        }
+    bits = get_policy_bits(user)
+    return {field: bool(bits & bit) for field, bit in POLICY_PERMISSION_BITS.items()}
@@ -0,0 +1,183 @@
+# audit.py
+# Buffered writer for the file_upload_log audit table.
+#
+# log_file_upload_task used to open a transaction per event. Events now go
+# into a bounded in-process queue; a background thread writes them as one
+# multi-row INSERT whenever ETL_AUDIT_BATCH_SIZE events are waiting or the
+# oldest has waited ETL_AUDIT_FLUSH_INTERVAL seconds. When the queue is
+# full, write() blocks for up to ETL_AUDIT_PUT_TIMEOUT seconds and then
+# raises AuditQueueFull, so producers slow down instead of growing memory.
+#
+# Each (forked) worker process has its own writer, started on first use and
+# flushed by close_audit_writer() on worker shutdown (see data/celery.py).
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from sqlalchemy import column, insert, table
+
+from .db import get_engine
+
+logger = logging.getLogger(__name__)
+
+
+AUDIT_BATCH_SIZE = getattr(settings, "ETL_AUDIT_BATCH_SIZE", 500)
+AUDIT_FLUSH_INTERVAL = getattr(settings, "ETL_AUDIT_FLUSH_INTERVAL", 2.0)
+AUDIT_QUEUE_SIZE = getattr(settings, "ETL_AUDIT_QUEUE_SIZE", 10_000)
+AUDIT_PUT_TIMEOUT = getattr(settings, "ETL_AUDIT_PUT_TIMEOUT", 5.0)
+
+# Attempts per batch before it is logged and dropped
+AUDIT_WRITE_ATTEMPTS = 3
+
+# How often a thread collecting a batch checks whether close() was called
+_STOP_POLL_INTERVAL = 0.05
+
+file_upload_log = table(
+    "file_upload_log",
+    column("user_name"),
+    column("file_type"),
+    column("file_count"),
+    column("organization"),
+    column("upload_datetime"),
+)
+
+
+class AuditQueueFull(Exception):
+    """The audit queue stayed full for the whole put timeout."""
+
+
+class AuditWriter:
+    def __init__(self, table=file_upload_log, batch_size=None, flush_interval=None,
+                 max_queue=None, put_timeout=None, engine=None):
+        self.table = table
+        self.batch_size = batch_size or AUDIT_BATCH_SIZE
+        self.flush_interval = AUDIT_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.put_timeout = AUDIT_PUT_TIMEOUT if put_timeout is None else put_timeout
+        self._engine = engine
+        self._queue = queue.Queue(maxsize=max_queue or AUDIT_QUEUE_SIZE)
+        self._lock = threading.Lock()  # one writer of batches at a time
+        self._stopping = threading.Event()
+        self._thread = None
+        self.written = 0
+        self.dropped = 0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="audit-writer", daemon=True
+            )
+            self._thread.start()
+
+    def write(self, **row):
+        """Queue one row; blocks while the queue is full (up to put_timeout)."""
+        self.start()
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+        except queue.Full:
+            raise AuditQueueFull(
+                f"Audit queue full ({self._queue.maxsize} events) for {self.put_timeout}s"
+            )
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _take_batch(self, first_timeout):
+        """Wait for a first row, then collect up to batch_size within flush_interval."""
+        try:
+            batch = [self._queue.get(timeout=first_timeout)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        # Stop early on close() so the batch in hand is written before join()
+        while len(batch) < self.batch_size and not self._stopping.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, _STOP_POLL_INTERVAL)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, batch):
+        engine = self._engine or get_engine()
+        for attempt in range(1, AUDIT_WRITE_ATTEMPTS + 1):
+            try:
+                with self._lock, engine.begin() as conn:
+                    # One INSERT ... VALUES (...), (...), ... statement
+                    conn.execute(insert(self.table).values(batch))
+                self.written += len(batch)
+                return
+            except Exception:
+                if attempt == AUDIT_WRITE_ATTEMPTS:
+                    self.dropped += len(batch)
+                    logger.exception("Dropping %d audit events after %d attempts", len(batch), attempt)
+                    return
+                time.sleep(0.5 * attempt)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._take_batch(first_timeout=0.5)
+            if batch:
+                self._write_batch(batch)
+
+    def flush(self):
+        """Write everything queued so far, in the calling thread."""
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            self._write_batch(batch)
+
+    def close(self, timeout=10):
+        """Stop the background thread and flush what is left."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer():
+    """The writer of this process."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditWriter()
+    return _writer
+
+
+def close_audit_writer():
+    """Flush and stop this process's writer (worker shutdown)."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+
+
+def reset_audit_writer():
+    """Forget a writer inherited through fork; its thread did not survive it."""
+    global _writer
+    _writer = None
+
+
+atexit.register(close_audit_writer)
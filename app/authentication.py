@@ -0,0 +1,89 @@
+# authentication.py
+# Token authentication with the token -> user lookup cached.
+#
+# DRF's TokenAuthentication joins Token and User on every request. Clients
+# polling /me/, /my-features/ or /task-status/ present the same token over
+# and over, so CachedTokenAuthentication keeps the user id of each token in
+# Django's cache for ETL_AUTH_TOKEN_CACHE_TIMEOUT seconds. The user row
+# itself is read by primary key once per request (abac.request_cached), so
+# is_active and other changes apply at once in every process; no user
+# data, password hash included, is ever put in the cache.
+#
+# Entries are dropped from app.signals when the token is deleted or its
+# user is saved or deleted. Like the ABAC caches this needs a cache shared
+# by all processes; with a process-local one (abac.shared_cache_enabled()
+# is False) every request looks the token up.
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .abac import request_cached, shared_cache_enabled
+from .models import User
+
+
+TOKEN_CACHE_TIMEOUT = getattr(settings, "ETL_AUTH_TOKEN_CACHE_TIMEOUT", 60)
+
+
+def _token_key(key):
+    # Never put the credential itself into cache keys
+    return "auth:token:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _user_token_key(user_id):
+    return f"auth:user-token:{user_id}"
+
+
+def invalidate_token(key):
+    """Forget the cached user of token `key`."""
+    cache_key = _token_key(key)
+    cache.delete(cache_key)
+    if transaction.get_connection().in_atomic_block:
+        # A concurrent request may re-cache the old row before we commit
+        transaction.on_commit(lambda: cache.delete(cache_key))
+
+
+def invalidate_user_tokens(*user_ids):
+    """Forget the cached token lookups of the given users."""
+    keys = [_user_token_key(user_id) for user_id in user_ids]
+    stale = keys + list(cache.get_many(keys).values())
+    cache.delete_many(stale)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete_many(stale))
+
+
+def _request_user(user_id):
+    return request_cached(
+        ("user", user_id), lambda: User.objects.filter(pk=user_id).first()
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in TokenAuthentication that caches the token's user id briefly."""
+
+    def authenticate_credentials(self, key):
+        cache_key = _token_key(key)
+        shared = shared_cache_enabled()
+        user_id = cache.get(cache_key) if shared else None
+        user = _request_user(user_id) if user_id is not None else None
+
+        if user is None:
+            try:
+                token = Token.objects.select_related("user").get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed("Invalid token.")
+            user = token.user
+            if shared and user.is_active:
+                cache.set_many(
+                    {cache_key: user.pk, _user_token_key(user.pk): cache_key},
+                    TOKEN_CACHE_TIMEOUT,
+                )
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed("User inactive or deleted.")
+        # request.auth stays a Token, rebuilt without a query
+        return (user, Token(key=key, user=user))
@@ -0,0 +1,19 @@
+# checks.py
+# System checks for deployment settings the app relies on.
+from django.core.checks import Tags, Warning, register
+
+from .abac import shared_cache_enabled
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if shared_cache_enabled():
+        return []
+    return [
+        Warning(
+            "The default cache is process-local, so ABAC policies, memberships "
+            "and token lookups are not cached across requests.",
+            hint="Set REDIS_URL so web and worker processes share one cache.",
+            id="app.W001",
+        )
+    ]
@@ -0,0 +1,173 @@
+# db.py
+# Process-wide SQLAlchemy engine registry for the ETL MySQL database.
+#
+# tasks.py and views.py share one pooled engine per process instead of
+# calling create_engine() per task. Celery workers rebuild the pool after
+# fork (see data/celery.py); pool statistics are available via pool_stats().
+# The web process serves its own at /db-pool-stats/; every worker process
+# logs its own every ETL_DB_POOL_STATS_LOG_INTERVAL seconds
+# (start_pool_stats_logging).
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+
+MYSQL_USER = os.environ.get("MYSQL_USER", "root")
+MYSQL_PASSWORD = os.environ.get("MYSQL_PASSWORD", "root")
+MYSQL_HOST = os.environ.get("MYSQL_HOST", "localhost")
+MYSQL_PORT = os.environ.get("MYSQL_PORT", "3306")
+MYSQL_DB = "new_etl_db"
+
+ETL_DB_URL = getattr(
+    settings,
+    "ETL_DB_URL",
+    f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}",
+)
+
+# Pool settings (per process)
+POOL_SIZE = getattr(settings, "ETL_DB_POOL_SIZE", 5)
+MAX_OVERFLOW = getattr(settings, "ETL_DB_MAX_OVERFLOW", 10)
+POOL_TIMEOUT = getattr(settings, "ETL_DB_POOL_TIMEOUT", 30)
+POOL_RECYCLE = getattr(settings, "ETL_DB_POOL_RECYCLE", 1800)
+POOL_PRE_PING = getattr(settings, "ETL_DB_POOL_PRE_PING", True)
+
+# Seconds between pool statistics log lines in worker processes (0: off)
+POOL_STATS_LOG_INTERVAL = getattr(settings, "ETL_DB_POOL_STATS_LOG_INTERVAL", 60)
+
+logger = logging.getLogger(__name__)
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that records how long checkouts take (waiting for a free
+    connection, plus connecting when the pool grows).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.wait_count += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+    def wait_stats(self):
+        """(count, total seconds, max seconds) of checkouts so far, read together."""
+        with self._stats_lock:
+            return self.wait_count, self.wait_total, self.wait_max
+
+
+_engines = {}
+_lock = threading.Lock()
+
+
+def _build_engine(url):
+    connect_args = {}
+    if url.startswith("mysql"):
+        # local_infile lets the load_data loader use LOAD DATA LOCAL INFILE
+        connect_args["local_infile"] = True
+    return create_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+def get_engine(url=None):
+    """Return the shared engine for `url` (default: the ETL database)."""
+    url = url or ETL_DB_URL
+    engine = _engines.get(url)
+    if engine is None:
+        with _lock:
+            engine = _engines.get(url)
+            if engine is None:
+                engine = _engines[url] = _build_engine(url)
+    return engine
+
+
+def dispose_engines(close=True):
+    """
+    Dispose every pooled engine in this process.
+
+    After fork, call with close=False: the child must not close sockets it
+    inherited from the parent, only drop them and open its own.
+    """
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose(close=close)
+
+
+def pool_stats():
+    """Pool statistics for every engine in this process, keyed by database."""
+    stats = {}
+    for engine in list(_engines.values()):
+        pool = engine.pool
+        waits, wait_total, wait_max = (
+            pool.wait_stats() if isinstance(pool, TimedQueuePool) else (0, 0.0, 0.0)
+        )
+        stats[engine.url.render_as_string(hide_password=True)] = {
+            "pid": os.getpid(),
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": MAX_OVERFLOW,
+            "waits": waits,
+            "wait_total_seconds": round(wait_total, 6),
+            "wait_max_seconds": round(wait_max, 6),
+        }
+    return stats
+
+
+_reporter_stop = None
+
+
+def start_pool_stats_logging(interval=None):
+    """
+    Log pool_stats() of this process every `interval` seconds from a
+    daemon thread (Celery worker children, whose pools the web process
+    cannot see). Replaces a reporter started earlier in this process.
+    """
+    global _reporter_stop
+    interval = POOL_STATS_LOG_INTERVAL if interval is None else interval
+    stop_pool_stats_logging()
+    if not interval:
+        return
+
+    stop = _reporter_stop = threading.Event()
+
+    def report():
+        while not stop.wait(interval):
+            stats = pool_stats()
+            if stats:
+                logger.info("ETL database pool stats: %s", json.dumps(stats, sort_keys=True))
+
+    threading.Thread(target=report, name="db-pool-stats", daemon=True).start()
+
+
+def stop_pool_stats_logging():
+    global _reporter_stop
+    stop, _reporter_stop = _reporter_stop, None
+    if stop is not None:
+        stop.set()
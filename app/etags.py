@@ -0,0 +1,52 @@
+# etags.py
+# Conditional GETs for responses derived from the caller's ABAC data.
+#
+# /me/, /my-features/ and /user-permissions/ only change when the user's
+# policy, memberships or user row do, which is exactly when
+# abac.policy_stamp() changes. @policy_etag tags their responses with the
+# stamp and answers a matching If-None-Match with 304 before the view
+# evaluates any permission. Without a shared cache there is no stamp and
+# responses go out untagged (see abac.shared_cache_enabled).
+import functools
+
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .abac import policy_stamp
+
+
+def _matches(if_none_match, etag):
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored
+    etags = {tag.removeprefix("W/") for tag in parse_etags(if_none_match)}
+    return etag in etags
+
+
+def policy_etag(view_method):
+    """Decorate an APIView get() whose response depends only on the user's ABAC data."""
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        stamp = policy_stamp(request.user)
+        if stamp is None:
+            return view_method(self, request, *args, **kwargs)
+
+        renderer = getattr(request, "accepted_renderer", None)
+        etag = quote_etag(
+            f"{type(self).__name__}-{request.user.id}-{stamp}-{getattr(renderer, 'format', '')}"
+        )
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match and _matches(if_none_match, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            for name, value in headers.items():
+                response[name] = value
+        return response
+
+    return wrapper
@@ -0,0 +1,128 @@
+# fetchers.py
+# Concurrent client for the random-user API used by fetch_random_users_task.
+#
+# A large `count` is split into pages of at most RANDOM_USER_PAGE_SIZE,
+# fetched by up to FETCH_CONCURRENCY threads over one pooled
+# requests.Session. 429 and 5xx responses (and connection errors) are
+# retried with full-jitter exponential backoff, honouring Retry-After.
+# Pages are yielded as they arrive so the caller can append them to the
+# table without holding the whole result.
+#
+# The base URL is a setting (ETL_RANDOM_USER_API_URL), so the fetcher can
+# be pointed at a local stub server.
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+RANDOM_USER_API_URL = getattr(
+    settings, "ETL_RANDOM_USER_API_URL", "https://api.api-ninjas.com/v2/randomuser"
+)
+RANDOM_USER_API_KEY = getattr(settings, "ETL_RANDOM_USER_API_KEY", None)
+
+# Users requested per upstream call, and per task
+RANDOM_USER_PAGE_SIZE = getattr(settings, "ETL_RANDOM_USER_PAGE_SIZE", 30)
+RANDOM_USER_MAX_COUNT = getattr(settings, "ETL_RANDOM_USER_MAX_COUNT", 10_000)
+
+FETCH_CONCURRENCY = getattr(settings, "ETL_FETCH_CONCURRENCY", 4)
+FETCH_TIMEOUT = getattr(settings, "ETL_FETCH_TIMEOUT", 10)
+FETCH_MAX_ATTEMPTS = getattr(settings, "ETL_FETCH_MAX_ATTEMPTS", 5)
+FETCH_BACKOFF_BASE = getattr(settings, "ETL_FETCH_BACKOFF_BASE", 0.5)
+FETCH_BACKOFF_MAX = getattr(settings, "ETL_FETCH_BACKOFF_MAX", 30)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class FetchError(Exception):
+    """A page could not be fetched (after retries) or had the wrong shape."""
+
+
+def build_session(api_key=None, pool_size=None):
+    """A Session whose connection pool fits `pool_size` concurrent requests."""
+    pool_size = pool_size or FETCH_CONCURRENCY
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if api_key:
+        session.headers["X-Api-Key"] = api_key
+    return session
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Seconds to wait before retry number `attempt` (1-based)."""
+    if retry_after:
+        try:
+            return min(float(retry_after), FETCH_BACKOFF_MAX)
+        except ValueError:
+            pass  # HTTP-date form: fall back to our own schedule
+    return random.uniform(0, min(FETCH_BACKOFF_MAX, FETCH_BACKOFF_BASE * 2 ** attempt))
+
+
+def fetch_page(session, count, url=None, max_attempts=None, sleep=time.sleep):
+    """Fetch one page of `count` users, retrying transient failures."""
+    url = url or RANDOM_USER_API_URL
+    max_attempts = max_attempts or FETCH_MAX_ATTEMPTS
+    for attempt in range(1, max_attempts + 1):
+        retry_after = None
+        try:
+            response = session.get(url, params={"count": count}, timeout=FETCH_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = f"{type(e).__name__}: {e}"
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                response.raise_for_status()
+                users = response.json()
+                if not isinstance(users, list):
+                    raise FetchError("API returned unexpected format")
+                return users
+            error = f"HTTP {response.status_code}"
+            retry_after = response.headers.get("Retry-After")
+        if attempt < max_attempts:
+            sleep(backoff_delay(attempt, retry_after))
+    raise FetchError(f"Giving up after {max_attempts} attempts ({error})")
+
+
+def page_sizes(count, page_size=None):
+    page_size = page_size or RANDOM_USER_PAGE_SIZE
+    return [min(page_size, count - start) for start in range(0, count, page_size)]
+
+
+def iter_random_users(count, url=None, api_key=None, concurrency=None, page_size=None):
+    """
+    Yield lists of users (one per upstream page, in completion order)
+    until `count` users were requested. At most `concurrency` requests are
+    in flight; a page that fails for good raises FetchError and cancels the
+    pages not started yet.
+    """
+    concurrency = concurrency or FETCH_CONCURRENCY
+    api_key = api_key if api_key is not None else RANDOM_USER_API_KEY
+    pages = iter(page_sizes(count, page_size))
+
+    with build_session(api_key, concurrency) as session, ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="random-users"
+    ) as executor:
+        in_flight = set()
+
+        def submit_next():
+            size = next(pages, None)
+            if size is not None:
+                in_flight.add(executor.submit(fetch_page, session, size, url))
+
+        for _ in range(concurrency):
+            submit_next()
+        try:
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.discard(future)
+                    users = future.result()
+                    submit_next()
+                    yield users
+        finally:
+            for future in in_flight:
+                future.cancel()
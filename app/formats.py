@@ -0,0 +1,215 @@
+# formats.py
+# File format detection and the parser registry used by the ETL load paths.
+#
+# detect_format() picks exactly one parser from magic bytes, the file
+# extension, the content type and a small text sample, instead of trying
+# every pandas reader in turn. New formats plug in with register_parser().
+import csv
+import io
+import json
+import os
+
+import pandas as pd
+
+
+# Bytes read from the start of a payload for sniffing
+SAMPLE_SIZE = 64 * 1024
+
+# name -> parser spec (see register_parser)
+PARSERS = {}
+
+
+def register_parser(
+    name,
+    read,
+    iter_chunks=None,
+    extensions=(),
+    content_types=(),
+    magic=(),
+):
+    """
+    Register a parser for a file format.
+
+    Args:
+        name: format name recorded on UploadedFile.file_format
+        read: callable(buffer) -> DataFrame
+        iter_chunks: optional callable(buffer, chunk_size) -> iterator of
+            DataFrames; formats without one are read once and sliced
+        extensions: file extensions (with dot) that map to this format
+        content_types: MIME types that map to this format
+        magic: byte prefixes that identify this format
+    """
+    PARSERS[name] = {
+        "name": name,
+        "read": read,
+        "iter_chunks": iter_chunks,
+        "extensions": tuple(ext.lower() for ext in extensions),
+        "content_types": tuple(ct.lower() for ct in content_types),
+        "magic": tuple(magic),
+    }
+    return PARSERS[name]
+
+
+def _as_buffer(source):
+    """Accept raw bytes or anything pandas can read (path, file object)."""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return source
+
+
+def _read_sample(source, size=SAMPLE_SIZE):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source[:size])
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read(size)
+    position = source.tell()
+    sample = source.read(size)
+    source.seek(position)
+    return sample
+
+
+def _detect_by_magic(sample):
+    for name, spec in PARSERS.items():
+        if any(sample.startswith(prefix) for prefix in spec["magic"]):
+            return name
+    return None
+
+
+def _detect_by_extension(filename):
+    if not filename:
+        return None
+    ext = os.path.splitext(filename.split("?")[0])[1].lower()
+    for name, spec in PARSERS.items():
+        if ext and ext in spec["extensions"]:
+            return name
+    return None
+
+
+def _detect_by_content_type(content_type):
+    if not content_type:
+        return None
+    content_type = content_type.split(";")[0].strip().lower()
+    for name, spec in PARSERS.items():
+        if content_type in spec["content_types"]:
+            return name
+    return None
+
+
+def _detect_by_sample(sample):
+    text = sample.decode("utf-8-sig", errors="ignore").lstrip()
+    if not text:
+        return None
+
+    if text[0] in "[{":
+        # One JSON document per line -> ndjson, otherwise a single document
+        lines = [line for line in text.splitlines() if line.strip()]
+        if text[0] == "{" and len(lines) > 1:
+            try:
+                json.loads(lines[0])
+                return "ndjson"
+            except ValueError:
+                pass
+        return "json"
+
+    if text[0] == "<":
+        return "xml"
+
+    try:
+        dialect = csv.Sniffer().sniff(text[:8192], delimiters=",;\t|")
+    except csv.Error:
+        return "csv"
+    return "tsv" if dialect.delimiter == "\t" and "tsv" in PARSERS else "csv"
+
+
+def detect_format(source, filename=None, content_type=None):
+    """
+    Choose a single format for the payload.
+
+    Binary signatures win, then the file extension, then the content type,
+    then a look at the text sample. Raises ValueError if nothing matches.
+    """
+    sample = _read_sample(source)
+    if not sample:
+        raise ValueError("File contains no data")
+
+    fmt = (
+        _detect_by_magic(sample)
+        or _detect_by_extension(filename)
+        or _detect_by_content_type(content_type)
+        or _detect_by_sample(sample)
+    )
+    if fmt not in PARSERS:
+        raise ValueError("Unsupported or unreadable file format.")
+    return fmt
+
+
+def read_dataframe(source, fmt):
+    """Parse the whole payload with the parser registered for `fmt`."""
+    return PARSERS[fmt]["read"](_as_buffer(source))
+
+
+def iter_dataframe_chunks(source, fmt, chunk_size):
+    """Yield DataFrames of at most `chunk_size` rows using the `fmt` parser."""
+    spec = PARSERS[fmt]
+    if spec["iter_chunks"] is not None:
+        yield from spec["iter_chunks"](_as_buffer(source), chunk_size)
+        return
+
+    df = spec["read"](_as_buffer(source))
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+# Built-in formats
+
+register_parser(
+    "csv",
+    read=lambda buf: pd.read_csv(buf),
+    iter_chunks=lambda buf, size: pd.read_csv(buf, chunksize=size),
+    extensions=(".csv",),
+    content_types=("text/csv", "application/csv"),
+)
+
+register_parser(
+    "tsv",
+    read=lambda buf: pd.read_csv(buf, sep="\t"),
+    iter_chunks=lambda buf, size: pd.read_csv(buf, sep="\t", chunksize=size),
+    extensions=(".tsv", ".tab"),
+    content_types=("text/tab-separated-values",),
+)
+
+register_parser(
+    "ndjson",
+    read=lambda buf: pd.read_json(buf, lines=True),
+    iter_chunks=lambda buf, size: pd.read_json(buf, lines=True, chunksize=size),
+    extensions=(".ndjson", ".jsonl"),
+    content_types=("application/x-ndjson", "application/jsonl"),
+)
+
+register_parser(
+    "json",
+    read=lambda buf: pd.read_json(buf),
+    extensions=(".json",),
+    content_types=("application/json", "text/json"),
+)
+
+register_parser(
+    "xml",
+    read=lambda buf: pd.read_xml(buf),
+    extensions=(".xml",),
+    content_types=("application/xml", "text/xml"),
+    magic=(b"<?xml", b"\xef\xbb\xbf<?xml"),
+)
+
+register_parser(
+    "excel",
+    read=lambda buf: pd.read_excel(buf),
+    extensions=(".xlsx", ".xlsm", ".xls"),
+    content_types=(
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "application/vnd.ms-excel",
+    ),
+    # xlsx is a zip container, legacy xls is an OLE2 compound file
+    magic=(b"PK\x03\x04", b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"),
+)
@@ -0,0 +1,152 @@
+# loaders.py
+# Loader backends that append a DataFrame to a MySQL table.
+#
+#   to_sql     plain DataFrame.to_sql (one INSERT per row via executemany)
+#   multirow   batched multi-row INSERT ... VALUES (...), (...)
+#   load_data  MySQL LOAD DATA LOCAL INFILE from a temporary delimited file;
+#              falls back to multirow when the server or driver refuses it
+#
+# Every loader takes an open connection so the caller owns the transaction.
+import logging
+import os
+import tempfile
+
+import pandas as pd
+from django.conf import settings
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_LOADER = getattr(settings, "ETL_DEFAULT_LOADER", "to_sql")
+
+# Rows per multi-row INSERT statement
+INSERT_BATCH_SIZE = getattr(settings, "ETL_INSERT_BATCH_SIZE", 1000)
+
+# name -> callable(df, table_name, conn) -> rows loaded
+LOADERS = {}
+
+
+def register_loader(name):
+    def decorator(func):
+        LOADERS[name] = func
+        return func
+    return decorator
+
+
+def get_loader(name=None):
+    """Return the loader registered as `name` (default: ETL_DEFAULT_LOADER)."""
+    name = name or DEFAULT_LOADER
+    try:
+        return LOADERS[name]
+    except (KeyError, TypeError):
+        raise ValueError(
+            f"Unknown loader '{name}'. Choose one of: {', '.join(sorted(LOADERS))}"
+        )
+
+
+def load_dataframe(df, table_name, conn, loader=None):
+    """
+    Append `df` to `table_name` on `conn` with the selected loader.
+
+    A MySQL table that does not exist yet is created here, from `df`'s
+    columns plus an auto-increment `_row_id` primary key, so every ETL
+    table (uploads, random_users, ...) can be keyset-paginated by
+    /database-records/. pandas alone would create it without a key.
+    """
+    if conn.dialect.name == "mysql" and not inspect(conn).has_table(table_name):
+        from .ingestion import add_row_id
+
+        df.head(0).to_sql(table_name, con=conn, index=False)
+        add_row_id(conn, table_name)
+    return get_loader(loader)(df, table_name, conn)
+
+
+@register_loader("to_sql")
+def to_sql_loader(df, table_name, conn):
+    df.to_sql(table_name, con=conn, if_exists="append", index=False)
+    return len(df)
+
+
+@register_loader("multirow")
+def multirow_loader(df, table_name, conn):
+    df.to_sql(
+        table_name,
+        con=conn,
+        if_exists="append",
+        index=False,
+        method="multi",
+        chunksize=INSERT_BATCH_SIZE,
+    )
+    return len(df)
+
+
+# LOAD DATA escaping: backslash first, then the field/line separators
+_ESCAPES = [("\\", "\\\\"), ("\t", "\\t"), ("\n", "\\n"), ("\r", "\\r"), ("\0", "\\0")]
+
+
+def _to_load_data_column(series):
+    """Render one column as LOAD DATA text, with \\N for NULL."""
+    nulls = series.isna()
+    if pd.api.types.is_bool_dtype(series):
+        values = series.astype("int8").astype(str)
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        values = series.dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+    else:
+        values = series.astype(str)
+        if not pd.api.types.is_numeric_dtype(series):
+            for raw, escaped in _ESCAPES:
+                values = values.str.replace(raw, escaped, regex=False)
+    return values.mask(nulls, "\\N")
+
+
+def write_load_data_file(df, path):
+    """Write `df` as a tab-delimited file in LOAD DATA's default escaping."""
+    columns = [_to_load_data_column(df[col]) for col in df.columns]
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for row in zip(*columns):
+            f.write("\t".join(row))
+            f.write("\n")
+
+
+def quote_identifier(conn, name):
+    """
+    Quote a table/column name for `conn`'s dialect (backticks doubled on
+    MySQL). Colons are escaped so text() does not read them as bind
+    parameters.
+    """
+    return conn.dialect.identifier_preparer.quote(str(name)).replace(":", "\\:")
+
+
+@register_loader("load_data")
+def load_data_infile_loader(df, table_name, conn):
+    if conn.dialect.name != "mysql":
+        return multirow_loader(df, table_name, conn)
+
+    # Let pandas create the table (and its column types) if needed
+    df.head(0).to_sql(table_name, con=conn, if_exists="append", index=False)
+
+    fd, path = tempfile.mkstemp(suffix=".tsv")
+    os.close(fd)
+    try:
+        write_load_data_file(df, path)
+        # Names come from the uploaded file's header and the request
+        columns = ", ".join(quote_identifier(conn, col) for col in df.columns)
+        sql = (
+            f"LOAD DATA LOCAL INFILE :path INTO TABLE {quote_identifier(conn, table_name)} "
+            "CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+            "LINES TERMINATED BY '\\n' "
+            f"({columns})"
+        )
+        try:
+            conn.execute(text(sql), {"path": path.replace("\\", "/")})
+        except DBAPIError as e:
+            # local_infile disabled on the server or client: use INSERTs
+            logger.warning("LOAD DATA LOCAL INFILE failed (%s), falling back to multirow", e.orig)
+            return multirow_loader(df, table_name, conn)
+    finally:
+        os.unlink(path)
+
+    return len(df)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from sqlalchemy import inspect
+
+from app.db import get_engine
+from app.models import UploadedFile
+from app.ingestion import ROW_ID_COLUMN, add_row_id
+from app.records import REFLECTION_TTL, forget_table
+
+
+class Command(BaseCommand):
+    help = (
+        f'Add an auto-increment `{ROW_ID_COLUMN}` primary key to ETL tables that have none (needed for keyset pagination). '
+        'Running web processes keep their cached reflection of each table: restart them, or wait '
+        f'REFLECTION_TTL ({REFLECTION_TTL} s), before /database-records/ pages the fixed tables.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tables', nargs='*', help='Tables to fix (default: every table recorded in UploadedFile)')
+
+    def handle(self, *args, **options):
+        engine = get_engine()
+        inspector = inspect(engine)
+        tables = options['tables'] or sorted(
+            name for name in UploadedFile.objects.values_list('table_name', flat=True).distinct()
+            if name and inspector.has_table(name)
+        )
+
+        fixed = 0
+        for table in tables:
+            if not inspector.has_table(table):
+                raise CommandError(f'Table {table} does not exist')
+            if add_row_id(engine, table):
+                forget_table(table)
+                fixed += 1
+                self.stdout.write(self.style.SUCCESS(f'Added {ROW_ID_COLUMN} to {table}'))
+        self.stdout.write(self.style.SUCCESS(f'Done. {fixed} table(s) updated.'))
@@ -0,0 +1,67 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from app.abac import shared_cache_enabled
+from app.authentication import CachedTokenAuthentication, _token_key
+from app.models import User
+
+
+class Command(BaseCommand):
+    help = 'Compare queries and time per request of TokenAuthentication and CachedTokenAuthentication.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Authenticated requests per backend')
+        parser.add_argument('--username', help='Authenticate as this existing user (default: a temporary user)')
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        temporary = None
+        if options['username']:
+            user = User.objects.get(username=options['username'])
+        else:
+            temporary = user = User.objects.create_user(f'bench-auth-{uuid.uuid4().hex[:8]}')
+        token, _ = Token.objects.get_or_create(user=user)
+
+        try:
+            request = RequestFactory().get('/me/', HTTP_AUTHORIZATION=f'Token {token.key}')
+            cache.delete(_token_key(token.key))
+            self.stdout.write(f"{requests} requests as {user.username}, cache {settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]}")
+            if not shared_cache_enabled():
+                self.stdout.write(self.style.WARNING(
+                    "The cache is process-local, so CachedTokenAuthentication does not cache (set REDIS_URL)."
+                ))
+
+            results = {}
+            for backend in (TokenAuthentication(), CachedTokenAuthentication()):
+                name = backend.__class__.__name__
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    for _ in range(requests):
+                        authenticated, _ = backend.authenticate(request)
+                    elapsed = time.perf_counter() - start
+                if authenticated.pk != user.pk:
+                    self.stdout.write(self.style.ERROR(f"{name}: authenticated the wrong user"))
+                results[name] = (len(queries), elapsed)
+                self.stdout.write(
+                    f"{name:<26} {len(queries):6d} queries  {elapsed * 1e6 / requests:8.1f} us/request"
+                )
+
+            baseline_queries, baseline_time = results['TokenAuthentication']
+            cached_queries, cached_time = results['CachedTokenAuthentication']
+            self.stdout.write(self.style.SUCCESS(
+                f"Saved {baseline_queries - cached_queries} of {baseline_queries} queries, "
+                f"{baseline_time / cached_time:.1f}x faster"
+            ))
+        finally:
+            cache.delete(_token_key(token.key))
+            if temporary is not None:
+                temporary.delete()
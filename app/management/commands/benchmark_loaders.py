@@ -0,0 +1,75 @@
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from sqlalchemy import text
+
+from app.db import get_engine
+from app.ingestion import load_chunks
+from app.loaders import LOADERS
+
+
+def make_frame(rows, seed=0):
+    """Synthetic upload: ints, floats, text with escapes, timestamps, bools, NULLs."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "id": np.arange(rows),
+        "amount": rng.normal(100, 25, rows).round(2),
+        "name": [f"user {i}\twith tab" if i % 97 == 0 else f"user {i}" for i in range(rows)],
+        "created": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 86400 * 365, rows), unit="s"),
+        "active": rng.random(rows) > 0.5,
+    })
+    df.loc[df.index % 50 == 0, "amount"] = np.nan
+    return df
+
+
+class Command(BaseCommand):
+    help = 'Compare load backends (to_sql, multirow, load_data) on a synthetic table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--chunk-size', type=int, default=50_000)
+        parser.add_argument('--loaders', nargs='+', default=sorted(LOADERS), choices=sorted(LOADERS))
+        parser.add_argument('--repeat', type=int, default=1, help='Runs per loader; the best run is reported')
+        parser.add_argument('--database-url', help='SQLAlchemy URL (default: the ETL MySQL database)')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark tables')
+
+    def handle(self, *args, **options):
+        engine = get_engine(options['database_url'])
+
+        rows = options['rows']
+        chunk_size = options['chunk_size']
+        df = make_frame(rows)
+        self.stdout.write(f"{rows} rows, chunk size {chunk_size}, dialect {engine.dialect.name}")
+
+        results = {}
+        for name in options['loaders']:
+            table = f"bench_loader_{name}"
+            best = None
+            for _ in range(options['repeat']):
+                with engine.begin() as conn:
+                    conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+                chunks = (df.iloc[i:i + chunk_size] for i in range(0, rows, chunk_size))
+                start = time.perf_counter()
+                load_chunks(chunks, table, engine, uploaded_at=datetime.utcnow(), loader=name)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+
+            with engine.connect() as conn:
+                loaded = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+            if loaded != rows:
+                self.stdout.write(self.style.ERROR(f"{name}: expected {rows} rows, found {loaded}"))
+
+            results[name] = best
+            self.stdout.write(f"{name:<10} {best:8.2f}s  {rows / best:12,.0f} rows/s")
+
+            if not options['keep']:
+                with engine.begin() as conn:
+                    conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+
+        baseline = results.get('to_sql')
+        if baseline:
+            for name, elapsed in results.items():
+                self.stdout.write(self.style.SUCCESS(f"{name}: {baseline / elapsed:.1f}x vs to_sql"))
@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.provisioning import ProvisioningError, import_users, parse_user_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create users, their policies and organization memberships from a CSV or JSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (header row) or JSON (list of objects) file')
+        parser.add_argument('--format', choices=['csv', 'json'], help='File format (default: from the extension or content)')
+        parser.add_argument('--workers', type=int, help='Processes hashing passwords (default: ETL_PASSWORD_HASH_WORKERS or one per CPU)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format']
+        if fmt is None and path.lower().endswith(('.csv', '.json')):
+            fmt = path.rsplit('.', 1)[1].lower()
+
+        try:
+            with open(path, 'rb') as f:
+                rows = parse_user_rows(f.read(), fmt)
+        except OSError as e:
+            raise CommandError(str(e))
+        except (ProvisioningError, UnicodeDecodeError) as e:
+            raise CommandError(f'{path}: {e}')
+
+        # An operator running the command may set initial permissions
+        result = import_users(rows, workers=options['workers'], allow_permissions=True)
+
+        for error in result['errors']:
+            self.stderr.write(
+                f"Row {error['row']} ({error.get('username') or '-'}): {json.dumps(error['errors'])}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['created']} user(s); {len(result['errors'])} row(s) rejected."
+        ))
@@ -0,0 +1,20 @@
+# middleware.py
+from .abac import end_request_cache, start_request_cache
+
+
+class ABACRequestCacheMiddleware:
+    """
+    Gives every request its own ABAC lookup cache, so repeated permission
+    checks within one request (views, schema generation) hit the database
+    or shared cache at most once per user.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = start_request_cache()
+        try:
+            return self.get_response(request)
+        finally:
+            end_request_cache(token)
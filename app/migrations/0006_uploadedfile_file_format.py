@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0005_uploadedfile_rows_added"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="uploadedfile",
+            name="file_format",
+            field=models.CharField(
+                blank=True,
+                help_text="Format chosen by app.formats.detect_format (csv, json, excel, ...)",
+                max_length=32,
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:40
+
+from django.db import migrations, models
+
+
+# Frozen copy of app.models.POLICY_PERMISSION_BITS as of this migration.
+# Migrations must not import live model code: later changes to the table
+# would silently rewrite what this migration does.
+PERMISSION_BITS = {
+    "can_upload": 1 << 0,
+    "can_read": 1 << 1,
+    "can_delete": 1 << 2,
+    "can_read_all_files": 1 << 3,
+    "can_add_user": 1 << 4,
+    "can_delete_user": 1 << 5,
+    "can_set_permissions": 1 << 6,
+}
+
+
+def compile_bits(apps, schema_editor):
+    Policy = apps.get_model("app", "Policy")
+    policies = list(Policy.objects.all())
+    for policy in policies:
+        policy.permission_bits = sum(
+            bit for field, bit in PERMISSION_BITS.items() if getattr(policy, field)
+        )
+    Policy.objects.bulk_update(policies, ["permission_bits"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0006_uploadedfile_file_format"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="policy",
+            name="permission_bits",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Compiled permission flags (maintained automatically)",
+            ),
+        ),
+        migrations.RunPython(compile_bits, migrations.RunPython.noop),
+    ]
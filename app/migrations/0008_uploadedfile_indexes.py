@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0007_policy_permission_bits"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="uploadedfile",
+            index=models.Index(fields=["user", "uploaded_at"], name="uploadedfile_user_uploaded"),
+        ),
+        migrations.AddIndex(
+            model_name="uploadedfile",
+            index=models.Index(fields=["table_name"], name="uploadedfile_table_name"),
+        ),
+        migrations.AddIndex(
+            model_name="uploadedfile",
+            index=models.Index(fields=["uploaded_at", "id"], name="uploadedfile_uploaded_id"),
+        ),
+    ]
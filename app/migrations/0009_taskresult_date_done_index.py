@@ -0,0 +1,51 @@
+# Retention purges (app.results.purge_results) scan the result backend's
+# table by date_done. django-celery-results indexes it from its migration
+# 0009_groupresult (tidied up in 0010); this adds one only where that index
+# is missing. The dependency is pinned to 0010: "__latest__" would move
+# with every package release and break migrate on existing databases.
+
+from django.db import migrations
+
+INDEX_NAME = "etl_taskresult_date_done"
+TABLE = "django_celery_results_taskresult"
+
+
+def _has_date_done_index(schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, TABLE)
+    return any(
+        info["index"] and info["columns"][:1] == ["date_done"]
+        for info in constraints.values()
+    )
+
+
+def add_index(apps, schema_editor):
+    if not _has_date_done_index(schema_editor):
+        quote = schema_editor.quote_name
+        schema_editor.execute(
+            f"CREATE INDEX {quote(INDEX_NAME)} ON {quote(TABLE)} ({quote('date_done')})"
+        )
+
+
+def remove_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, TABLE)
+    if INDEX_NAME in constraints:
+        TaskResult = apps.get_model("django_celery_results", "TaskResult")
+        schema_editor.execute(
+            schema_editor._delete_index_sql(TaskResult, INDEX_NAME)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0008_uploadedfile_indexes"),
+        ("django_celery_results", "0010_remove_duplicate_indices"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_index, remove_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0009_taskresult_date_done_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RandomUserReservoir",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("payload", models.JSONField(help_text="One user as returned by the random-user API")),
+                ("fetched_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
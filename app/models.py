@@ -63,6 +63,28 @@ class User(AbstractUser):
         return f"{self.username}{org_str}"
 
 
+# Bit assigned to each Policy permission field in Policy.permission_bits.
+# Append new permissions at the end; never renumber existing bits.
+POLICY_PERMISSION_BITS = {
+    "can_upload": 1 << 0,
+    "can_read": 1 << 1,
+    "can_delete": 1 << 2,
+    "can_read_all_files": 1 << 3,
+    "can_add_user": 1 << 4,
+    "can_delete_user": 1 << 5,
+    "can_set_permissions": 1 << 6,
+}
+
+
+def compile_permission_bits(obj):
+    """OR together the bits of every permission flag set on `obj`."""
+    bits = 0
+    for field, bit in POLICY_PERMISSION_BITS.items():
+        if getattr(obj, field, False):
+            bits |= bit
+    return bits
+
+
 # Policy model for ABAC
 class Policy(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, unique=True)
@@ -84,6 +106,20 @@ class Policy(models.Model):
     )
     # Add more permissions as needed
 
+    # The flags above compiled into one integer (see POLICY_PERMISSION_BITS),
+    # kept in sync by save(). Code that bypasses save() (queryset.update,
+    # bulk_update) must set it with compile_permission_bits().
+    permission_bits = models.PositiveIntegerField(
+        default=0, help_text="Compiled permission flags (maintained automatically)"
+    )
+
+    def save(self, *args, **kwargs):
+        self.permission_bits = compile_permission_bits(self)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "permission_bits" not in update_fields:
+            kwargs["update_fields"] = list(update_fields) + ["permission_bits"]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Policy for {self.user.username} (upload: {self.can_upload}, read: {self.can_read}, delete: {self.can_delete})"
 
@@ -95,12 +131,44 @@ class UploadedFile(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     table_name = models.CharField(max_length=255, blank=True, null=True)
     rows_added = models.IntegerField(default=0)
-    # Add more fields as needed (e.g., file_format, status, etc.)
+    file_format = models.CharField(
+        max_length=32, blank=True, null=True,
+        help_text="Format chosen by app.formats.detect_format (csv, json, excel, ...)"
+    )
+    # Add more fields as needed (e.g., status, etc.)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "uploaded_at"], name="uploadedfile_user_uploaded"),
+            models.Index(fields=["table_name"], name="uploadedfile_table_name"),
+            # Serves the newest-first listing in UploadedFileListAPIView
+            models.Index(fields=["uploaded_at", "id"], name="uploadedfile_uploaded_id"),
+        ]
 
     def __str__(self):
         return f"{self.filename} uploaded by {self.user.username}"
 
 
+# Buffer of pre-fetched random users (see app.reservoir)
+class RandomUserReservoir(models.Model):
+    payload = models.JSONField(help_text="One user as returned by the random-user API")
+    fetched_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Reservoir user {self.pk} fetched at {self.fetched_at}"
+
+
+# Who queued a Celery task; the task-status endpoints only show a user
+# their own tasks (see app.progress.owned_task_ids)
+class TaskOwner(models.Model):
+    task_id = models.CharField(max_length=255, unique=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Task {self.task_id} queued by {self.user_id}"
+
+
 # Register models in admin
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
@@ -134,5 +202,5 @@ class PolicyAdmin(admin.ModelAdmin):
 
 
 class UploadedFileAdmin(admin.ModelAdmin):
-    list_display = ("filename", "user", "uploaded_at", "table_name")
+    list_display = ("filename", "user", "uploaded_at", "table_name", "file_format")
     search_fields = ("filename", "user__username", "table_name")
@@ -0,0 +1,61 @@
+# pagination.py
+# Opaque, signed continuation tokens for keyset (cursor) pagination.
+import datetime
+
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder rounds times to milliseconds; a key must round-trip
+    # exactly or rows sharing the truncated value are skipped
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class _CursorSerializer(signing.JSONSerializer):
+    def dumps(self, obj):
+        return _CursorEncoder(separators=(",", ":")).encode(obj).encode("latin-1")
+
+
+def encode_cursor(scope, values):
+    """
+    Encode the key values of the last row served as an opaque token.
+    `scope` (e.g. the table name) binds the token to one listing.
+    """
+    return signing.dumps(
+        {"s": scope, "k": list(values)},
+        salt="app.pagination",
+        serializer=_CursorSerializer,
+        compress=True,
+    )
+
+
+def decode_cursor(scope, token):
+    """Return the key values stored in `token`, or raise InvalidCursor."""
+    try:
+        payload = signing.loads(token, salt="app.pagination", serializer=_CursorSerializer)
+    except signing.BadSignature:
+        raise InvalidCursor("Invalid continuation token.")
+    if payload.get("s") != scope:
+        raise InvalidCursor("Continuation token does not belong to this listing.")
+    return payload["k"]
+
+
+def parse_limit(value, default, maximum):
+    """Parse a `limit` query parameter, clamped to [1, maximum]."""
+    if value in (None, ""):
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer.")
+    if limit < 1:
+        raise ValueError("limit must be positive.")
+    return min(limit, maximum)
@@ -0,0 +1,339 @@
+# progress.py
+# Structured task progress, published by the worker and streamed to clients.
+#
+# Tasks call publish_progress() as they go. Every update is written to the
+# Django cache (cheap, shared with the web processes when CACHES points at
+# Redis) and, at most every PROGRESS_STATE_INTERVAL seconds or on a stage
+# change, to the Celery result backend through update_state(). The
+# /task-status/<id>/events/ stream and TaskStatusAPIView read the cache
+# first, so watching a task does not mean polling the django-db backend.
+#
+# When a task ends, a terminal entry (stage "finished") carrying the Celery
+# state and result is published from the task_postrun signal. A run that
+# ends in a retry publishes stage "retrying" instead; the task is not done.
+import json
+import time
+
+from celery.signals import task_postrun
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+# Seconds a progress entry outlives its last update
+PROGRESS_TTL = getattr(settings, "ETL_TASK_PROGRESS_TTL", 3600)
+
+# Minimum seconds between PROGRESS writes to the result backend
+PROGRESS_STATE_INTERVAL = getattr(settings, "ETL_TASK_PROGRESS_STATE_INTERVAL", 5)
+
+FINISHED = "finished"
+RETRYING = "retrying"
+
+_last_state_write = {}
+
+
+def _progress_key(task_id):
+    return f"task-progress:{task_id}"
+
+
+def read_progress(task_id):
+    """The latest progress entry of `task_id`, or None."""
+    return cache.get(_progress_key(task_id))
+
+
+def _write(task_id, entry):
+    previous = read_progress(task_id) or {}
+    entry["seq"] = previous.get("seq", 0) + 1
+    entry["updated_at"] = time.time()
+    cache.set(_progress_key(task_id), entry, PROGRESS_TTL)
+    return entry, previous
+
+
+def publish_progress(task, stage, **fields):
+    """
+    Publish the current stage of `task` (e.g. "parsing", "loading") with
+    counters such as rows_parsed and rows_loaded.
+    """
+    task_id = task.request.id
+    if not task_id:
+        # Called directly (not through a worker): nobody is listening
+        return None
+
+    entry, previous = _write(task_id, {"state": "PROGRESS", "stage": stage, **fields})
+
+    now = time.monotonic()
+    if stage != previous.get("stage") or now - _last_state_write.get(task_id, 0) >= PROGRESS_STATE_INTERVAL:
+        _last_state_write[task_id] = now
+        task.update_state(state="PROGRESS", meta={"stage": stage, **fields})
+    return entry
+
+
+@task_postrun.connect
+def publish_finished(task_id=None, state=None, retval=None, **kwargs):
+    _last_state_write.pop(task_id, None)
+    if not task_id:
+        return
+    if isinstance(retval, BaseException):
+        retval = str(retval)
+    if state == "RETRY":
+        # Queued again: streams keep following it
+        _write(task_id, {"state": state, "stage": RETRYING, "reason": retval})
+        return
+    _write(task_id, {"state": state, "stage": FINISHED, "result": retval})
+
+
+# /task-status/<id>/events/ stream settings (seconds)
+EVENTS_POLL_INTERVAL = getattr(settings, "ETL_TASK_EVENTS_POLL_INTERVAL", 0.5)
+EVENTS_HEARTBEAT = getattr(settings, "ETL_TASK_EVENTS_HEARTBEAT", 15)
+EVENTS_MAX_DURATION = getattr(settings, "ETL_TASK_EVENTS_MAX_DURATION", 300)
+# Without a progress entry (task queued, or a per-process cache), ask the
+# result backend this often
+EVENTS_BACKEND_INTERVAL = getattr(settings, "ETL_TASK_EVENTS_BACKEND_INTERVAL", 5)
+# Streams one user may hold open at once; each one occupies a web worker
+EVENTS_MAX_STREAMS_PER_USER = getattr(settings, "ETL_TASK_EVENTS_MAX_STREAMS_PER_USER", 3)
+
+READY_STATES = ("SUCCESS", "FAILURE", "REVOKED")
+
+
+def backend_status(task_id):
+    """Task state from the Celery result backend, as a progress-style entry."""
+    from celery.result import AsyncResult
+    from data.celery import app
+
+    result = AsyncResult(task_id, app=app)
+    state = result.state
+    entry = {"state": state}
+    if state in READY_STATES:
+        info = result.info
+        entry["stage"] = FINISHED
+        entry["result"] = info if state == "SUCCESS" else str(info)
+    elif state == "PROGRESS" and isinstance(result.info, dict):
+        entry.update(result.info)
+    return entry
+
+
+def task_status(task_id):
+    """Current status of `task_id`, from the progress cache when possible."""
+    entry = read_progress(task_id)
+    if entry is None:
+        entry = backend_status(task_id)
+    return entry
+
+
+def _event(name, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {name}")
+    lines.append("data: " + DjangoJSONEncoder(separators=(",", ":")).encode(data))
+    return "\n".join(lines) + "\n\n"
+
+
+def iter_task_events(task_id, last_seq=0):
+    """
+    Server-sent events for `task_id`: a "progress" event per new progress
+    entry, "finished" once the task ends, and comment heartbeats in
+    between. The stream ends after EVENTS_MAX_DURATION ("timeout" event);
+    clients reconnect with Last-Event-ID to resume.
+    """
+    started = last_heartbeat = time.monotonic()
+    # Ask the backend straight away if the cache has nothing to say
+    last_change = started - EVENTS_BACKEND_INTERVAL
+    last_backend_check = None
+    last_backend_entry = None
+    yield "retry: 2000\n\n"
+
+    while True:
+        now = time.monotonic()
+        entry = read_progress(task_id)
+        if entry is not None and entry["seq"] > last_seq:
+            last_seq = entry["seq"]
+            last_change = last_heartbeat = now
+            finished = entry.get("stage") == FINISHED
+            yield _event("finished" if finished else "progress", {"task_id": task_id, **entry}, last_seq)
+            if finished:
+                return
+
+        # Nothing new in the cache for a while (queued, worker lost, or a
+        # cache the worker does not share): fall back to the result backend
+        elif now - last_change >= EVENTS_BACKEND_INTERVAL and (
+            last_backend_check is None or now - last_backend_check >= EVENTS_BACKEND_INTERVAL
+        ):
+            last_backend_check = now
+            backend_entry = backend_status(task_id)
+            if backend_entry != last_backend_entry and backend_entry["state"] != "PENDING":
+                last_backend_entry = backend_entry
+                last_heartbeat = now
+                finished = backend_entry.get("stage") == FINISHED
+                yield _event("finished" if finished else "progress", {"task_id": task_id, **backend_entry})
+                if finished:
+                    return
+
+        if now - started >= EVENTS_MAX_DURATION:
+            yield _event("timeout", {"task_id": task_id})
+            return
+        if now - last_heartbeat >= EVENTS_HEARTBEAT:
+            last_heartbeat = now
+            yield ": keep-alive\n\n"
+        time.sleep(EVENTS_POLL_INTERVAL)
+
+
+def record_task_owner(task_id, user):
+    """Remember that `user` queued `task_id` (call right after enqueueing)."""
+    from .models import TaskOwner
+
+    TaskOwner.objects.get_or_create(task_id=task_id, defaults={"user_id": user.id})
+
+
+def owned_task_ids(user, task_ids):
+    """The subset of `task_ids` queued by `user`, in one query."""
+    from .models import TaskOwner
+
+    return set(
+        TaskOwner.objects.filter(user_id=user.id, task_id__in=list(task_ids))
+        .values_list("task_id", flat=True)
+    )
+
+
+def _streams_key(user_id):
+    return f"task-events:streams:{user_id}"
+
+
+def _release_stream(user_id):
+    try:
+        cache.decr(_streams_key(user_id))
+    except ValueError:
+        pass  # counter expired meanwhile
+
+
+class TaskEventStream:
+    """
+    iter_task_events() holding one of the user's stream slots. The slot is
+    given back by close(), which StreamingHttpResponse calls when the
+    response ends, even if the client left before the first event.
+    """
+
+    def __init__(self, user_id, task_id, last_seq=0):
+        self.user_id = user_id
+        self._events = iter_task_events(task_id, last_seq)
+        self._closed = False
+
+    def __iter__(self):
+        return self._events
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._events.close()
+            _release_stream(self.user_id)
+
+
+def open_task_events(user, task_id, last_seq=0):
+    """
+    A TaskEventStream for `user`, or None when the user already holds
+    EVENTS_MAX_STREAMS_PER_USER open streams.
+    """
+    key = _streams_key(user.id)
+    # Outlives any stream, so slots leaked by a killed process come back
+    timeout = EVENTS_MAX_DURATION * 2
+    cache.add(key, 0, timeout)
+    try:
+        open_streams = cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout)
+        open_streams = 1
+    if open_streams > EVENTS_MAX_STREAMS_PER_USER:
+        _release_stream(user.id)
+        return None
+    cache.touch(key, timeout)
+    return TaskEventStream(user.id, task_id, last_seq)
+
+
+# Fields a batch status lookup can return -> TaskResult column
+STATUS_FIELDS = {
+    "status": "status",
+    "result": "result",
+    "progress": "result",
+    "task_name": "task_name",
+    "worker": "worker",
+    "date_created": "date_created",
+    "date_started": "date_started",
+    "date_done": "date_done",
+    "traceback": "traceback",
+}
+DEFAULT_STATUS_FIELDS = ("status", "result")
+
+
+def _decode_result(row):
+    raw = row.get("result")
+    if raw is None or row.get("content_type") != "application/json":
+        return raw
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+
+def batch_task_status(task_ids, fields=None, owner=None):
+    """
+    Status of many tasks with one TaskResult query (plus one cache
+    round trip for live progress when "progress" is requested).
+
+    Returns {task_id: {field: value}} restricted to `fields` (see
+    STATUS_FIELDS); unknown task ids are reported as PENDING, as Celery
+    does. With `owner`, tasks queued by someone else are reported as
+    unknown. Raises ValueError for an unknown field.
+    """
+    from django_celery_results.models import TaskResult
+
+    fields = list(dict.fromkeys(fields or DEFAULT_STATUS_FIELDS))
+    unknown = [field for field in fields if field not in STATUS_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Unknown field(s) {unknown}. Choose from: {', '.join(STATUS_FIELDS)}"
+        )
+    task_ids = list(dict.fromkeys(task_ids))
+    visible = task_ids
+    if owner is not None:
+        owned = owned_task_ids(owner, task_ids)
+        visible = [task_id for task_id in task_ids if task_id in owned]
+
+    columns = {"task_id", "status"} | {STATUS_FIELDS[field] for field in fields}
+    if "result" in columns:
+        columns.add("content_type")
+    rows = {
+        row["task_id"]: row
+        for row in TaskResult.objects.filter(task_id__in=visible).values(*columns)
+    }
+
+    live = {}
+    if "progress" in fields and visible:
+        keys = {_progress_key(task_id): task_id for task_id in visible}
+        live = {keys[key]: entry for key, entry in cache.get_many(list(keys)).items()}
+
+    statuses = {}
+    for task_id in task_ids:
+        row = rows.get(task_id, {"status": "PENDING"})
+        entry = live.get(task_id)
+        if entry is not None and entry.get("stage") != FINISHED and row["status"] not in READY_STATES:
+            # The cache is ahead of the (throttled) backend writes
+            row = dict(row, status=entry["state"])
+
+        status = {}
+        for field in fields:
+            if field == "result":
+                status[field] = _decode_result(row) if row["status"] in READY_STATES else None
+            elif field == "progress":
+                if row["status"] != "PROGRESS":
+                    status[field] = None
+                elif entry is not None and entry.get("stage") != FINISHED:
+                    status[field] = {
+                        key: value for key, value in entry.items()
+                        if key not in ("state", "seq", "updated_at")
+                    }
+                else:
+                    status[field] = _decode_result(row)
+            else:
+                status[field] = row.get(STATUS_FIELDS[field])
+        statuses[task_id] = status
+    return statuses
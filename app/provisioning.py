@@ -0,0 +1,304 @@
+# provisioning.py
+# Bulk user import: users, their policies and organization memberships in
+# one transaction.
+#
+# Creating users one by one costs a create_user(), the create_user_policy
+# signal and an m2m add per user, each with its own round trip. Here rows
+# are validated up front, passwords are hashed in a process pool (the
+# hasher is deliberately slow), and the three tables are filled with
+# bulk_create. Rows that fail validation are reported and skipped; the
+# others are still created.
+#
+# assign_permissions() does the same for policy changes of existing users.
+import csv
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+
+from .models import POLICY_PERMISSION_BITS, Organization, Policy, User, compile_permission_bits
+from .serializers_auth import BulkUserRowSerializer
+
+
+# Largest import accepted in one request or command run
+USER_IMPORT_MAX_ROWS = getattr(settings, "ETL_USER_IMPORT_MAX_ROWS", 10_000)
+
+# Worker processes hashing passwords (default: one per CPU)
+PASSWORD_HASH_WORKERS = getattr(settings, "ETL_PASSWORD_HASH_WORKERS", None)
+
+# Below this many passwords a process pool costs more than it saves
+PARALLEL_HASH_THRESHOLD = 32
+
+BULK_BATCH_SIZE = 1000
+
+
+class ProvisioningError(Exception):
+    """The import as a whole cannot be processed (unreadable, too large)."""
+
+
+def _csv_rows(text):
+    rows = []
+    for row in csv.DictReader(io.StringIO(text)):
+        # Empty cells fall back to the serializer defaults
+        row = {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        if "organization_ids" in row:
+            row["organization_ids"] = [v for v in row["organization_ids"].replace(",", ";").split(";") if v.strip()]
+        rows.append(row)
+    return rows
+
+
+def parse_user_rows(data, fmt=None):
+    """
+    Parse an import file (bytes or str) into a list of row dicts; a list
+    (an already decoded JSON body) is only size-checked.
+    `fmt` is "csv" or "json"; guessed from the first character when omitted.
+    """
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    if fmt is None and not isinstance(data, list):
+        fmt = "json" if data.lstrip()[:1] in ("[", "{") else "csv"
+
+    if isinstance(data, list):
+        rows = data
+    elif fmt == "csv":
+        rows = _csv_rows(data)
+    elif fmt == "json":
+        try:
+            rows = json.loads(data)
+        except ValueError as e:
+            raise ProvisioningError(f"Invalid JSON: {e}")
+        if isinstance(rows, dict):
+            rows = rows.get("users")
+        if not isinstance(rows, list):
+            raise ProvisioningError('JSON must be a list of users or {"users": [...]}.')
+    else:
+        raise ProvisioningError(f"Unknown format '{fmt}'. Use csv or json.")
+
+    if len(rows) > USER_IMPORT_MAX_ROWS:
+        raise ProvisioningError(
+            f"Too many rows ({len(rows)}); at most {USER_IMPORT_MAX_ROWS} per import."
+        )
+    return rows
+
+
+def hash_passwords(passwords, workers=None):
+    """make_password() for each password, in parallel for large batches."""
+    passwords = list(passwords)
+    # Daemonic processes (e.g. Celery prefork children) cannot fork a pool
+    if len(passwords) < PARALLEL_HASH_THRESHOLD or multiprocessing.current_process().daemon:
+        return [make_password(password) for password in passwords]
+    workers = workers or PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(make_password, passwords, chunksize=chunksize))
+
+
+def _validate(rows, allow_permissions=False):
+    """
+    Split rows into (valid, errors); valid items are (row number, data).
+    Rows setting any can_* flag are rejected unless `allow_permissions`.
+    """
+    valid, errors = [], []
+    seen = set()
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({"row": number, "errors": {"non_field_errors": ["Expected an object."]}})
+            continue
+        row = dict(row)
+        if "organization_id" in row and "organization_ids" not in row:
+            row["organization_ids"] = [row.pop("organization_id")]
+        serializer = BulkUserRowSerializer(data=row)
+        if not serializer.is_valid():
+            errors.append({"row": number, "username": row.get("username"), "errors": serializer.errors})
+            continue
+        data = serializer.validated_data
+        granted = [field for field in POLICY_PERMISSION_BITS if data[field]]
+        if granted and not allow_permissions:
+            errors.append({"row": number, "username": data["username"], "errors": {field: ["Granting permissions requires the set_permissions permission."] for field in granted}})
+            continue
+        if data["username"] in seen:
+            errors.append({"row": number, "username": data["username"], "errors": {"username": ["Duplicate username in this import."]}})
+            continue
+        seen.add(data["username"])
+        valid.append((number, data))
+
+    # Usernames already taken and unknown organizations, one query each
+    taken = set(
+        User.objects.filter(username__in=[data["username"] for _, data in valid])
+        .values_list("username", flat=True)
+    )
+    wanted_orgs = {org_id for _, data in valid for org_id in data["organization_ids"]}
+    known_orgs = set(Organization.objects.filter(id__in=wanted_orgs).values_list("id", flat=True))
+
+    checked = []
+    for number, data in valid:
+        if data["username"] in taken:
+            errors.append({"row": number, "username": data["username"], "errors": {"username": ["A user with that username already exists."]}})
+        elif set(data["organization_ids"]) - known_orgs:
+            missing = sorted(set(data["organization_ids"]) - known_orgs)
+            errors.append({"row": number, "username": data["username"], "errors": {"organization_ids": [f"Unknown organization id(s): {missing}"]}})
+        else:
+            checked.append((number, data))
+    return checked, errors
+
+
+def _insert(valid, password_hashes):
+    """Create users, policies and memberships; returns username -> id."""
+    users = [
+        User(
+            username=data["username"],
+            email=data["email"],
+            role=data["role"],
+            password=password_hash,
+            # User.save() is bypassed by bulk_create; keep its invariants
+            is_staff=True,
+            is_superuser=True,
+        )
+        for (_, data), password_hash in zip(valid, password_hashes)
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=BULK_BATCH_SIZE)
+        # MySQL does not return primary keys from bulk inserts
+        ids = dict(
+            User.objects.filter(username__in=[user.username for user in users])
+            .values_list("username", "id")
+        )
+
+        policies = []
+        for _, data in valid:
+            policy = Policy(
+                user_id=ids[data["username"]],
+                **{field: data[field] for field in POLICY_PERMISSION_BITS},
+            )
+            policy.permission_bits = compile_permission_bits(policy)
+            policies.append(policy)
+        Policy.objects.bulk_create(policies, batch_size=BULK_BATCH_SIZE)
+
+        Membership = User.organizations.through
+        Membership.objects.bulk_create(
+            [
+                Membership(user_id=ids[data["username"]], organization_id=org_id)
+                for _, data in valid
+                for org_id in dict.fromkeys(data["organization_ids"])
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+    return ids
+
+
+def import_users(rows, workers=None, allow_permissions=False):
+    """
+    Validate and create `rows` (dicts as produced by parse_user_rows).
+
+    New users get an all-False policy, as with POST /user-management/;
+    rows with can_* flags set are only accepted with `allow_permissions`
+    (the importing manager holds set_permissions, or an operator runs
+    manage.py import_users).
+
+    Returns {"created": n, "users": [{row, username, id}], "errors": [{row, username, errors}]}.
+    """
+    valid, errors = _validate(rows, allow_permissions)
+    password_hashes = hash_passwords([data["password"] for _, data in valid], workers)
+
+    try:
+        ids = _insert(valid, password_hashes)
+    except IntegrityError:
+        # A username was taken between validation and insert: check again
+        # and retry once without the rows that now conflict
+        taken = set(
+            User.objects.filter(username__in=[data["username"] for _, data in valid])
+            .values_list("username", flat=True)
+        )
+        kept = [(item, h) for item, h in zip(valid, password_hashes) if item[1]["username"] not in taken]
+        for number, data in valid:
+            if data["username"] in taken:
+                errors.append({"row": number, "username": data["username"], "errors": {"username": ["A user with that username already exists."]}})
+        valid = [item for item, _ in kept]
+        ids = _insert(valid, [h for _, h in kept])
+
+    errors.sort(key=lambda error: error["row"])
+    created = [
+        {"row": number, "username": data["username"], "id": ids[data["username"]]}
+        for number, data in valid
+    ]
+    return {"created": len(created), "users": created, "errors": errors}
+
+
+def assign_permissions(manager, entries):
+    """
+    Apply many {"user_id", "allowed_operations"} entries on behalf of
+    `manager` in one transaction.
+
+    Target users and their policies are loaded with one query each and the
+    ABAC target rule is evaluated in memory for every entry; entries that
+    are malformed, unknown or not permitted are reported in `errors` and
+    skipped. The rest are written with one bulk_update (plus a bulk_create
+    for users without a policy row).
+
+    Returns {"updated": n, "created": n, "results": [...], "errors": [...]}.
+    """
+    from .abac import ACTION_FIELDS, evaluate_permissions, invalidate_policy
+
+    errors = []
+    wanted = {}
+    for index, entry in enumerate(entries):
+        user_id = entry.get("user_id") if isinstance(entry, dict) else None
+        ops = entry.get("allowed_operations") if isinstance(entry, dict) else None
+        if not isinstance(user_id, int) or isinstance(user_id, bool) or not isinstance(ops, list):
+            errors.append({"index": index, "user_id": user_id, "error": "user_id and allowed_operations (list) required"})
+            continue
+        unknown = [op for op in ops if op not in ACTION_FIELDS]
+        if unknown:
+            errors.append({"index": index, "user_id": user_id, "error": f"Unknown operation(s): {unknown}"})
+            continue
+        if user_id in wanted:
+            errors.append({"index": index, "user_id": user_id, "error": "Duplicate user_id in this request"})
+            continue
+        wanted[user_id] = (index, ops)
+
+    existing = set(User.objects.filter(id__in=wanted).values_list("id", flat=True))
+    for user_id in [user_id for user_id in wanted if user_id not in existing]:
+        index, _ = wanted.pop(user_id)
+        errors.append({"index": index, "user_id": user_id, "error": "User not found"})
+
+    checks = [("set_permissions", {"target_user_id": user_id}) for user_id in wanted]
+    for user_id, allowed in zip(list(wanted), evaluate_permissions(manager, checks)):
+        if not allowed:
+            index, _ = wanted.pop(user_id)
+            errors.append({"index": index, "user_id": user_id, "error": "Cannot modify this user's permissions"})
+
+    fields = list(ACTION_FIELDS.values())
+    with transaction.atomic():
+        policies = {policy.user_id: policy for policy in Policy.objects.filter(user_id__in=wanted)}
+        new_policies = []
+        for user_id, (_, ops) in wanted.items():
+            policy = policies.get(user_id)
+            if policy is None:
+                policy = Policy(user_id=user_id)
+                new_policies.append(policy)
+            for action, field in ACTION_FIELDS.items():
+                setattr(policy, field, action in ops)
+            policy.permission_bits = compile_permission_bits(policy)
+
+        Policy.objects.bulk_update(
+            list(policies.values()), fields + ["permission_bits"], batch_size=BULK_BATCH_SIZE
+        )
+        Policy.objects.bulk_create(new_policies, batch_size=BULK_BATCH_SIZE)
+        # bulk_update/bulk_create send no signals
+        if wanted:
+            invalidate_policy(*wanted)
+
+    errors.sort(key=lambda error: error["index"])
+    return {
+        "updated": len(policies),
+        "created": len(new_policies),
+        "results": [
+            {"user_id": user_id, "allowed_operations": ops} for user_id, (_, ops) in wanted.items()
+        ],
+        "errors": errors,
+    }
@@ -0,0 +1,348 @@
+# records.py
+# Read access to ETL tables for DatabaseRecordsAPIView.
+#
+# Tables are reflected once (and cached briefly) so identifiers are checked
+# against the real schema, and pages are fetched by keyset on the primary
+# key: WHERE key > :last ORDER BY key LIMIT n costs the same on every page,
+# unlike OFFSET. Column projection, typed predicates and ordering compile
+# to parameterized SQL so MySQL does the filtering.
+import csv
+import datetime
+import decimal
+import io
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date, parse_datetime
+from sqlalchemy import MetaData, Table, and_, false, or_, select
+from sqlalchemy.exc import NoSuchTableError
+
+from .pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+RECORDS_PAGE_SIZE = getattr(settings, "ETL_RECORDS_PAGE_SIZE", 1000)
+RECORDS_MAX_PAGE_SIZE = getattr(settings, "ETL_RECORDS_MAX_PAGE_SIZE", 10_000)
+
+# Rows fetched from the server-side cursor and written per streamed batch
+EXPORT_BATCH_SIZE = getattr(settings, "ETL_EXPORT_BATCH_SIZE", 5000)
+
+# Export formats -> content type
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Seconds a reflected table definition is reused
+REFLECTION_TTL = 300
+
+
+class RecordsError(Exception):
+    """Client error in a records request (bad table, column or parameter)."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+_reflected = {}
+_reflect_lock = threading.Lock()
+
+
+def reflect_table(engine, table_name):
+    """Return the reflected Table for `table_name`, cached for REFLECTION_TTL."""
+    key = (str(engine.url), table_name)
+    cached = _reflected.get(key)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+
+    try:
+        table = Table(table_name, MetaData(), autoload_with=engine)
+    except NoSuchTableError:
+        raise RecordsError(f"Table '{table_name}' does not exist.", status=404)
+
+    with _reflect_lock:
+        _reflected[key] = (table, time.monotonic() + REFLECTION_TTL)
+    return table
+
+
+def forget_table(table_name):
+    """Drop cached reflections of `table_name` (after DDL on it)."""
+    with _reflect_lock:
+        for key in [k for k in _reflected if k[1] == table_name]:
+            del _reflected[key]
+
+
+def key_columns(table):
+    """Primary key columns used as the stable keyset ordering."""
+    columns = list(table.primary_key.columns)
+    if not columns:
+        raise RecordsError(
+            f"Table '{table.name}' has no primary key to paginate on. "
+            f"Run `python manage.py add_row_ids {table.name}` once to add one."
+        )
+    return columns
+
+
+def coerce_value(column, raw):
+    """Convert a raw (string/JSON) value to the column's Python type."""
+    if raw is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return raw
+
+    if isinstance(raw, python_type) and not (python_type is int and isinstance(raw, bool)):
+        return raw
+    try:
+        if python_type is datetime.datetime:
+            value = parse_datetime(str(raw))
+        elif python_type is datetime.date:
+            value = parse_date(str(raw))
+        elif python_type is bool:
+            value = str(raw).lower() in ("1", "true", "yes")
+        elif python_type is decimal.Decimal:
+            value = decimal.Decimal(str(raw))
+        else:
+            value = python_type(raw)
+    except (TypeError, ValueError, decimal.InvalidOperation):
+        value = None
+    if value is None:
+        raise RecordsError(f"Invalid value {raw!r} for column '{column.name}'.")
+    return value
+
+
+def _as_list(value):
+    """Comma-separated string (query string) or list (JSON body) -> list."""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [part.strip() for part in str(value).split(",") if part.strip()]
+
+
+def _names(value, parameter):
+    """_as_list() for column names: every entry must be a string."""
+    names = _as_list(value)
+    for name in names:
+        if not isinstance(name, str):
+            raise RecordsError(f"{parameter} must be column names (strings), got {name!r}.")
+    return names
+
+
+def _column(table, name):
+    try:
+        return table.columns[name]
+    except KeyError:
+        raise RecordsError(f"Unknown column '{name}' in table '{table.name}'.")
+
+
+def parse_columns(table, spec):
+    """`columns=a,b` -> list of Column; None/empty selects every column."""
+    names = _names(spec, "columns")
+    if not names:
+        return list(table.columns)
+    return [_column(table, name) for name in dict.fromkeys(names)]
+
+
+# Predicate operators accepted as `<column>__<op>=<value>`
+FILTER_OPERATORS = {
+    "eq": lambda col, values: col == values[0],
+    "lt": lambda col, values: col < values[0],
+    "gt": lambda col, values: col > values[0],
+    "in": lambda col, values: col.in_(values),
+    "between": lambda col, values: col.between(values[0], values[1]),
+}
+
+
+def parse_filters(table, filters):
+    """
+    Compile (`<column>__<op>`, value) pairs into bound SQL predicates.
+    Values are converted to the column type, never interpolated.
+    """
+    clauses = []
+    for key, raw in filters:
+        name, _, op = key.rpartition("__")
+        if not name or op not in FILTER_OPERATORS:
+            raise RecordsError(
+                f"Invalid filter '{key}'. Use <column>__<op> with op in: "
+                f"{', '.join(FILTER_OPERATORS)}."
+            )
+        column = _column(table, name)
+
+        if op == "in":
+            values = _as_list(raw)
+            if not values:
+                raise RecordsError(f"Filter '{key}' needs at least one value.")
+        elif op == "between":
+            values = _as_list(raw)
+            if len(values) != 2:
+                raise RecordsError(f"Filter '{key}' needs exactly two values.")
+        else:
+            values = [raw[0] if isinstance(raw, (list, tuple)) and len(raw) == 1 else raw]
+
+        values = [coerce_value(column, value) for value in values]
+        clauses.append(FILTER_OPERATORS[op](column, values))
+    return clauses
+
+
+def parse_order_by(table, spec, require_key=True):
+    """
+    `order_by=a,-b` -> [(Column, descending), ...], with the primary key
+    appended as a tie-breaker so the order is total (needed for keysets).
+    """
+    order = []
+    for name in _names(spec, "order_by"):
+        descending = name.startswith("-")
+        order.append((_column(table, name.lstrip("-")), descending))
+
+    seen = {column.name for column, _ in order}
+    keys = key_columns(table) if require_key else list(table.primary_key.columns)
+    order.extend((column, False) for column in keys if column.name not in seen)
+    return order
+
+
+def _order_clause(column, descending):
+    return column.desc() if descending else column.asc()
+
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def _after(column, value, descending):
+    """
+    Rows strictly after `value` in this column's order. MySQL sorts NULL
+    first ascending and last descending, so nothing comes after the NULL
+    group descending; within it only the tie-breaker columns advance.
+    """
+    if descending:
+        return false() if value is None else or_(column < value, column.is_(None))
+    return column.is_not(None) if value is None else column > value
+
+
+def keyset_condition(order, values):
+    """
+    WHERE clause selecting rows strictly after `values` in `order`:
+    (a > x) OR (a = x AND b > y) OR ...
+    """
+    clauses = []
+    for i, (column, descending) in enumerate(order):
+        equal = [_equal(order[j][0], values[j]) for j in range(i)]
+        clauses.append(and_(*equal, _after(column, values[i], descending)))
+    return or_(*clauses)
+
+
+def _order_scope(table_name, order):
+    return table_name + ":" + ",".join(
+        ("-" if descending else "") + column.name for column, descending in order
+    )
+
+
+def fetch_page(engine, table_name, limit=None, after=None, columns=None, filters=(), order_by=None):
+    """
+    Fetch one page of rows, optionally projected to `columns`, restricted
+    by `filters` and sorted by `order_by` (see parse_* above).
+
+    Returns (rows, next_token); next_token is None on the last page.
+    """
+    table = reflect_table(engine, table_name)
+    selected = parse_columns(table, columns)
+    where = parse_filters(table, filters)
+    order = parse_order_by(table, order_by)
+    limit = limit or RECORDS_PAGE_SIZE
+    scope = _order_scope(table_name, order)
+
+    # Key columns are fetched for the cursor even when not requested
+    selected_names = {column.name for column in selected}
+    extra = [column for column, _ in order if column.name not in selected_names]
+
+    query = select(*selected, *extra).where(*where)
+    if after:
+        try:
+            values = decode_cursor(scope, after)
+        except InvalidCursor as e:
+            raise RecordsError(str(e))
+        if len(values) != len(order):
+            raise RecordsError("Continuation token does not match this ordering.")
+        values = [coerce_value(column, value) for (column, _), value in zip(order, values)]
+        query = query.where(keyset_condition(order, values))
+    query = query.order_by(*[_order_clause(*item) for item in order]).limit(limit + 1)
+
+    with engine.connect() as conn:
+        rows = [dict(row._mapping) for row in conn.execute(query)]
+
+    next_token = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_token = encode_cursor(scope, [last[column.name] for column, _ in order])
+
+    if extra:
+        for row in rows:
+            for column in extra:
+                row.pop(column.name, None)
+    return rows, next_token
+
+
+def stream_rows(engine, table_name, batch_size=None, columns=None, filters=(), order_by=None):
+    """
+    Yield (columns, rows) batches from a server-side cursor, so only one
+    batch is held in memory. Ordered by `order_by` and then the primary
+    key when the table has one.
+    """
+    table = reflect_table(engine, table_name)
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    selected = parse_columns(table, columns)
+    where = parse_filters(table, filters)
+    order = parse_order_by(table, order_by, require_key=False)
+
+    query = select(*selected).where(*where)
+    if order:
+        query = query.order_by(*[_order_clause(*item) for item in order])
+
+    with engine.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, max_row_buffer=batch_size
+        ).execute(query)
+        names = list(result.keys())
+        for batch in result.partitions(batch_size):
+            yield names, batch
+
+
+def iter_export(engine, table_name, export_format, batch_size=None, columns=None, filters=(), order_by=None):
+    """
+    Render the (projected, filtered) table as NDJSON or CSV, one encoded
+    chunk of bytes per batch. Parameters are validated before the first
+    byte so errors surface as a normal error response.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise RecordsError(
+            f"Unknown export format. Choose one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    table = reflect_table(engine, table_name)
+    header = [column.name for column in parse_columns(table, columns)]
+    parse_filters(table, filters)
+    parse_order_by(table, order_by, require_key=False)
+    options = {"batch_size": batch_size, "columns": columns, "filters": filters, "order_by": order_by}
+
+    def ndjson():
+        encoder = DjangoJSONEncoder(separators=(",", ":"))
+        for names, batch in stream_rows(engine, table_name, **options):
+            lines = [encoder.encode(dict(zip(names, row))) for row in batch]
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+    def csv_rows():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        yield buffer.getvalue().encode("utf-8")
+        for _names, batch in stream_rows(engine, table_name, **options):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(batch)
+            yield buffer.getvalue().encode("utf-8")
+
+    return ndjson() if export_format == "ndjson" else csv_rows()
@@ -0,0 +1,151 @@
+# reservoir.py
+# Optional local buffer of pre-fetched random users.
+#
+# With ETL_RANDOM_USER_RESERVOIR_ENABLED, refill_random_user_reservoir_task
+# (celery beat) keeps up to ETL_RANDOM_USER_RESERVOIR_TARGET users in the
+# RandomUserReservoir table, and fetch_random_users_task serves requests by
+# moving rows from it into `random_users` in bulk. Whatever the reservoir
+# cannot cover is fetched live.
+#
+# A move claims a batch with SELECT ... FOR UPDATE SKIP LOCKED (concurrent
+# tasks take disjoint rows), appends it to the ETL table and deletes it, all
+# in one transaction on the ETL engine; if the load fails, the rows stay in
+# the reservoir.
+#
+# This needs the reservoir table (a Django model, on DATABASES['default'])
+# and the ETL tables (app.db, ETL_DB_URL / MYSQL_* env) to be in the same
+# database. move_to_table() checks it and raises ReservoirError otherwise;
+# point both settings at one database before enabling the reservoir.
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from sqlalchemy import column, delete, select, table
+
+from .models import RandomUserReservoir
+
+
+RESERVOIR_ENABLED = getattr(settings, "ETL_RANDOM_USER_RESERVOIR_ENABLED", False)
+RESERVOIR_TARGET = getattr(settings, "ETL_RANDOM_USER_RESERVOIR_TARGET", 1000)
+
+# Rows moved per transaction
+RESERVOIR_MOVE_BATCH = getattr(settings, "ETL_RANDOM_USER_RESERVOIR_MOVE_BATCH", 1000)
+
+_REFILL_LOCK = "reservoir:random-users:refill"
+_REFILL_LOCK_TIMEOUT = 15 * 60
+
+
+_DEFAULT_PORTS = {"mysql": 3306, "postgresql": 5432}
+_LOCAL_HOSTS = {"", "localhost", "127.0.0.1", "::1"}
+
+
+class ReservoirError(Exception):
+    pass
+
+
+def _database_identity(backend, host, port, name):
+    backend = {"sqlite3": "sqlite", "postgres": "postgresql"}.get(backend, backend)
+    if backend == "sqlite":
+        return (backend, os.path.realpath(name or ""))
+    host = "localhost" if (host or "") in _LOCAL_HOSTS else host
+    return (backend, host, int(port or _DEFAULT_PORTS.get(backend, 0)), name)
+
+
+def same_database(url, settings_dict):
+    """True when SQLAlchemy `url` and Django `settings_dict` name one database."""
+    return _database_identity(
+        url.get_backend_name(), url.host, url.port, url.database
+    ) == _database_identity(
+        settings_dict["ENGINE"].rsplit(".", 1)[-1],
+        settings_dict.get("HOST"),
+        settings_dict.get("PORT"),
+        str(settings_dict.get("NAME") or ""),
+    )
+
+
+def check_database(engine):
+    """Raise ReservoirError unless `engine` is the database the reservoir model uses."""
+    alias = RandomUserReservoir.objects.db
+    if not same_database(engine.url, connections[alias].settings_dict):
+        raise ReservoirError(
+            f"The reservoir table is in Django's '{alias}' database but the ETL "
+            f"engine points at {engine.url.render_as_string(hide_password=True)}; "
+            "set ETL_DB_URL (or MYSQL_*) and DATABASES to the same database "
+            "or disable ETL_RANDOM_USER_RESERVOIR_ENABLED."
+        )
+
+
+def reservoir_size():
+    return RandomUserReservoir.objects.count()
+
+
+def refill(target=None, **fetch_options):
+    """
+    Top the reservoir up to `target` users from the live API. Only one
+    refill runs at a time; returns the number of users added (None when
+    another refill holds the lock).
+    """
+    from .fetchers import iter_random_users
+
+    target = RESERVOIR_TARGET if target is None else target
+    if not cache.add(_REFILL_LOCK, 1, _REFILL_LOCK_TIMEOUT):
+        return None
+    try:
+        missing = target - reservoir_size()
+        added = 0
+        if missing > 0:
+            for users in iter_random_users(missing, **fetch_options):
+                RandomUserReservoir.objects.bulk_create(
+                    [RandomUserReservoir(payload=user) for user in users]
+                )
+                added += len(users)
+        return added
+    finally:
+        cache.delete(_REFILL_LOCK)
+
+
+reservoir_table = table(
+    RandomUserReservoir._meta.db_table,
+    column("id"),
+    column("payload"),
+)
+
+
+def _claim(conn, count):
+    query = select(reservoir_table.c.id, reservoir_table.c.payload).order_by(reservoir_table.c.id).limit(count)
+    if conn.dialect.name != "sqlite":
+        query = query.with_for_update(skip_locked=True)
+    return conn.execute(query).all()
+
+
+def move_to_table(count, table_name, engine, loader=None, on_batch=None):
+    """
+    Move up to `count` reservoir users into `table_name`, one transaction
+    per batch. Returns the number of rows moved (less than `count` when the
+    reservoir runs dry). Raises ReservoirError if `engine` is not the
+    reservoir's database.
+    """
+    from .loaders import load_dataframe
+
+    check_database(engine)
+    moved = 0
+    while moved < count:
+        with engine.begin() as conn:
+            claimed = _claim(conn, min(RESERVOIR_MOVE_BATCH, count - moved))
+            if not claimed:
+                break
+            df = pd.DataFrame([
+                json.loads(payload) if isinstance(payload, (str, bytes)) else payload
+                for _, payload in claimed
+            ])
+            df["fetched_at"] = datetime.utcnow()
+            load_dataframe(df, table_name, conn, loader)
+            conn.execute(delete(reservoir_table).where(reservoir_table.c.id.in_([pk for pk, _ in claimed])))
+        moved += len(claimed)
+        if on_batch:
+            on_batch(moved)
+    return moved
@@ -0,0 +1,151 @@
+# results.py
+# Keeping the django-db result backend (django_celery_results' TaskResult
+# table) small.
+#
+#   ETLTask        task base class: a return value whose JSON exceeds
+#                  ETL_TASK_RESULT_MAX_BYTES is written to
+#                  ETL_TASK_RESULT_DIR and replaced in the backend by a
+#                  stub holding its small top-level fields
+#   purge_results  deletes (optionally archiving first) results older than
+#                  ETL_TASK_RESULT_RETENTION, in bounded batches; run
+#                  periodically by app.tasks.purge_task_results_task
+import datetime
+import gzip
+import json
+import os
+
+from celery import Task
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+
+# Seconds a finished task's result is kept
+RESULT_RETENTION = getattr(settings, "ETL_TASK_RESULT_RETENTION", 7 * 24 * 60 * 60)
+
+# Rows deleted per statement, and statements per purge run
+PURGE_BATCH_SIZE = getattr(settings, "ETL_TASK_RESULT_PURGE_BATCH_SIZE", 1000)
+PURGE_MAX_BATCHES = getattr(settings, "ETL_TASK_RESULT_PURGE_MAX_BATCHES", 50)
+
+# Directory for gzipped NDJSON archives of purged results (None: no archive)
+RESULT_ARCHIVE_DIR = getattr(settings, "ETL_TASK_RESULT_ARCHIVE_DIR", None)
+
+# Results larger than this (encoded JSON) are stored out of the table
+RESULT_MAX_BYTES = getattr(settings, "ETL_TASK_RESULT_MAX_BYTES", 16 * 1024)
+RESULT_DIR = getattr(
+    settings, "ETL_TASK_RESULT_DIR", os.path.join(settings.BASE_DIR, "task_results")
+)
+
+# Top-level values kept in the stub of an oversized result
+_STUB_MAX_STRING = 256
+
+
+def _encode(value):
+    return DjangoJSONEncoder(separators=(",", ":")).encode(value)
+
+
+def _result_path(task_id):
+    return os.path.join(RESULT_DIR, f"{task_id}.json.gz")
+
+
+def compact_result(task_id, retval):
+    """
+    Return `retval`, or a stub for it if its JSON is over RESULT_MAX_BYTES;
+    the full value is then written to RESULT_DIR (see load_full_result).
+    """
+    try:
+        encoded = _encode(retval)
+    except TypeError:
+        return retval  # not JSON; let the backend report the error
+    if len(encoded) <= RESULT_MAX_BYTES or not task_id:
+        return retval
+
+    os.makedirs(RESULT_DIR, exist_ok=True)
+    tmp = _result_path(task_id) + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        f.write(encoded)
+    os.replace(tmp, _result_path(task_id))
+
+    stub = {}
+    if isinstance(retval, dict):
+        stub = {
+            key: value
+            for key, value in retval.items()
+            if isinstance(value, (int, float, bool, type(None)))
+            or (isinstance(value, str) and len(value) <= _STUB_MAX_STRING)
+        }
+    stub.update({"result_stored": "file", "result_bytes": len(encoded)})
+    return stub
+
+
+def load_full_result(task_id):
+    """The full result of a task whose stored result is a stub, or None."""
+    try:
+        with gzip.open(_result_path(task_id), "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class ETLTask(Task):
+    """Base class for ETL tasks: oversized results are stored out of band."""
+
+    def __call__(self, *args, **kwargs):
+        retval = super().__call__(*args, **kwargs)
+        return compact_result(self.request.id, retval)
+
+
+def _archive(rows, archive_dir):
+    day = timezone.now().strftime("%Y%m%d")
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"taskresults-{day}.ndjson.gz")
+    # Appending gzip members keeps the file one valid (multi-member) gzip
+    with gzip.open(path, "at", encoding="utf-8") as f:
+        for row in rows:
+            f.write(_encode(row) + "\n")
+
+
+def purge_results(retention=None, batch_size=None, max_batches=None, archive_dir=None):
+    """
+    Delete TaskResult rows whose date_done is older than `retention`
+    seconds, oldest first, `batch_size` rows per DELETE and at most
+    `max_batches` DELETEs per call so one run never holds long locks.
+    Rows are appended to an archive first when an archive dir is set;
+    out-of-band result files and TaskOwner rows of purged tasks are removed.
+
+    Returns {"deleted": n, "done": bool}; done is False when rows older
+    than the cutoff remain for the next run.
+    """
+    from django_celery_results.models import TaskResult
+
+    from .models import TaskOwner
+
+    retention = RESULT_RETENTION if retention is None else retention
+    batch_size = batch_size or PURGE_BATCH_SIZE
+    max_batches = max_batches or PURGE_MAX_BATCHES
+    archive_dir = archive_dir or RESULT_ARCHIVE_DIR
+    cutoff = timezone.now() - datetime.timedelta(seconds=retention)
+
+    expired = TaskResult.objects.filter(date_done__lt=cutoff).order_by("date_done")
+    deleted = 0
+    for _ in range(max_batches):
+        columns = () if archive_dir else ("id", "task_id")
+        rows = list(expired.values(*columns)[:batch_size])
+        ids = [row["id"] for row in rows]
+        if not ids:
+            return {"deleted": deleted, "done": True}
+
+        if archive_dir:
+            _archive(rows, archive_dir)
+        deleted += TaskResult.objects.filter(id__in=ids).delete()[0]
+        TaskOwner.objects.filter(task_id__in=[row["task_id"] for row in rows]).delete()
+
+        for row in rows:
+            try:
+                os.unlink(_result_path(row["task_id"]))
+            except FileNotFoundError:
+                pass
+
+        if len(ids) < batch_size:
+            return {"deleted": deleted, "done": True}
+    return {"deleted": deleted, "done": False}
@@ -1,10 +1,100 @@
 # app/schema.py
+#
+# The generated schema only depends on which features the user has, and
+# there are few distinct feature sets, so each filtered schema is built
+# once and kept in memory, keyed by a hash of the feature set. The key also
+# covers the URLconf in use and the feature/endpoint definitions below, so
+# a new URLconf or changed definitions never serve a stale schema.
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.urls import get_resolver
 from drf_yasg.generators import OpenAPISchemaGenerator
-from .views import get_allowed_features
+
+from .views import FEATURE_ACTIONS, get_allowed_features
+
+
+# ✅ Feature names MUST match get_allowed_features()
+FEATURE_ENDPOINT_MAP = {
+    "update_platform_files": ["upload"],
+    "fetch_random_users": ["fetch-random-users"],
+    "uploaded_files": ["uploaded-files"],
+    "database_records": ["database-records"],
+    "user_management": ["user-management"],
+    "permission_management": ["user-permissions"],
+}
+
+ALWAYS_ALLOWED = ["me", "my-features", "task-status", "permissions/evaluate"]
+
+# Distinct schemas kept in memory (least recently used are dropped)
+SCHEMA_CACHE_SIZE = 32
+
+_schemas = OrderedDict()
+_schemas_lock = threading.Lock()
+_definitions_signature = None
+
+
+def _signature(value):
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def definitions_signature():
+    """Hash of the feature definitions that decide which endpoints are shown."""
+    global _definitions_signature
+    if _definitions_signature is None:
+        _definitions_signature = _signature(
+            [FEATURE_ACTIONS, FEATURE_ENDPOINT_MAP, ALWAYS_ALLOWED]
+        )
+    return _definitions_signature
+
+
+def clear_schema_cache():
+    global _definitions_signature
+    with _schemas_lock:
+        _schemas.clear()
+        _definitions_signature = None
 
 
 class PermissionBasedSchemaGenerator(OpenAPISchemaGenerator):
 
+    def _schema_cache_key(self, request, public):
+        if not request or not request.user.is_authenticated:
+            features = None
+        else:
+            features = sorted(get_allowed_features(request.user))
+        # The resolver object itself is part of the key: a different
+        # URLconf (or clear_url_caches()) gives a different resolver
+        resolver = get_resolver(getattr(request, "urlconf", None))
+        host = request.build_absolute_uri("/") if request else self.url
+        return (
+            resolver,
+            definitions_signature(),
+            _signature([features, host, self.version, public]),
+        )
+
+    def get_schema(self, request=None, public=False):
+        key = self._schema_cache_key(request, public)
+        with _schemas_lock:
+            schema = _schemas.get(key)
+            if schema is not None:
+                _schemas.move_to_end(key)
+                return schema
+
+        schema = super().get_schema(request, public)
+
+        with _schemas_lock:
+            if any(cached[0] is not key[0] for cached in _schemas):
+                # The URLconf was reloaded; entries for the old one are dead
+                _schemas.clear()
+            _schemas[key] = schema
+            while len(_schemas) > SCHEMA_CACHE_SIZE:
+                _schemas.popitem(last=False)
+        return schema
+
     def get_endpoints(self, request):
         endpoints = super().get_endpoints(request)
 
@@ -19,30 +109,18 @@ class PermissionBasedSchemaGenerator(OpenAPISchemaGenerator):
         user = request.user
         allowed_features = get_allowed_features(user)
 
-        # ✅ Feature names MUST match get_allowed_features()
-        feature_endpoint_map = {
-            "update_platform_files": ["upload"],
-            "fetch_random_users": ["fetch-random-users"],
-            "uploaded_files": ["uploaded-files"],
-            "database_records": ["database-records"],
-            "user_management": ["user-management"],
-            "permission_management": ["user-permissions"],
-        }
-
-        always_allowed = ["me", "my-features", "task-status"]
-
         filtered = {}
 
         for path, methods in endpoints.items():
             # Always visible endpoints
-            if any(x in path for x in always_allowed):
+            if any(x in path for x in ALWAYS_ALLOWED):
                 filtered[path] = methods
                 continue
 
             # Permission-based endpoints
             for feature in allowed_features:
-                if feature in feature_endpoint_map:
-                    if any(x in path for x in feature_endpoint_map[feature]):
+                if feature in FEATURE_ENDPOINT_MAP:
+                    if any(x in path for x in FEATURE_ENDPOINT_MAP[feature]):
                         filtered[path] = methods
                         break
 
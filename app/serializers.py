@@ -1,6 +1,8 @@
 
 from rest_framework import serializers
 from .models import UploadedFile
+from .loaders import LOADERS
+from .fetchers import RANDOM_USER_MAX_COUNT
 
 
 class FileUploadSerializer(serializers.Serializer):
@@ -8,9 +10,27 @@ class FileUploadSerializer(serializers.Serializer):
     Serializer for file upload ETL.
     - file: uploaded file (CSV / JSON / XML / Excel)
     - table_name: optional MySQL table name
+    - loader: optional load backend (to_sql, multirow, load_data)
     """
     file = serializers.FileField()
     table_name = serializers.CharField(required=False, allow_blank=True)
+    loader = serializers.ChoiceField(choices=sorted(LOADERS), required=False)
+
+
+class URLUploadSerializer(serializers.Serializer):
+    """
+    Serializer for URL upload ETL.
+    - url: URL of the file to download
+    - table_name: optional MySQL table name
+    - stream: optional chunked streaming (omitted: automatic for large files)
+    - chunk_size: optional rows per chunk in streaming mode
+    - loader: optional load backend (to_sql, multirow, load_data)
+    """
+    url = serializers.URLField()
+    table_name = serializers.CharField(required=False, allow_blank=True)
+    stream = serializers.BooleanField(required=False, allow_null=True, default=None)
+    chunk_size = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    loader = serializers.ChoiceField(choices=sorted(LOADERS), required=False)
 
 
 class RandomUserFetchSerializer(serializers.Serializer):
@@ -18,13 +38,15 @@ class RandomUserFetchSerializer(serializers.Serializer):
     Serializer for random user fetch API ETL.
     - count: number of random users to fetch (default: 2)
     """
-    count = serializers.IntegerField(required=False, default=2, min_value=1, max_value=100)
+    count = serializers.IntegerField(
+        required=False, default=2, min_value=1, max_value=RANDOM_USER_MAX_COUNT
+    )
 
 
 class UploadedFileSerializer(serializers.ModelSerializer):
     class Meta:
         model = UploadedFile
-        fields = ("id", "filename", "uploaded_at", "table_name", "user")
+        fields = ("id", "filename", "uploaded_at", "table_name", "file_format", "user")
 
 
 class PermissionAssignmentSerializer(serializers.Serializer):
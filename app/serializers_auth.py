@@ -52,3 +52,39 @@ class UserCreateSerializer(serializers.Serializer):
         )
         user.organizations.add(organization)
         return user
+
+
+class BulkUserRowSerializer(serializers.Serializer):
+    """
+    One row of a bulk user import (see app.provisioning).
+    - organization_ids: organizations to join (CSV: "1;2")
+    - can_*: initial policy flags (default False)
+    """
+    username = serializers.RegexField(
+        regex=r'^[\w.@+-]+$',
+        max_length=150,
+        min_length=1,
+        required=True,
+        help_text="Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only."
+    )
+    email = serializers.EmailField(required=False, allow_blank=True, default="")
+    password = serializers.CharField(write_only=True, min_length=1, required=True)
+    role = serializers.CharField(max_length=32, min_length=1, required=False, default="admin")
+    organization_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+    can_upload = serializers.BooleanField(default=False)
+    can_read = serializers.BooleanField(default=False)
+    can_delete = serializers.BooleanField(default=False)
+    can_read_all_files = serializers.BooleanField(default=False)
+    can_add_user = serializers.BooleanField(default=False)
+    can_delete_user = serializers.BooleanField(default=False)
+    can_set_permissions = serializers.BooleanField(default=False)
+
+
+class UserImportSerializer(serializers.Serializer):
+    """
+    Bulk user import.
+    - file: CSV (header row) or JSON (list of objects) with the columns of BulkUserRowSerializer
+    """
+    file = serializers.FileField()
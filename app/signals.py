@@ -1,8 +1,78 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 from django.dispatch import receiver
-from app.models import User, Policy
+from rest_framework.authtoken.models import Token
+from app.models import Organization, User, Policy
+from app.abac import bump_policy_stamp, invalidate_org_ids, invalidate_policy
+from app.authentication import invalidate_token, invalidate_user_tokens
 
 @receiver(post_save, sender=User)
 def create_user_policy(sender, instance, created, **kwargs):
     if created:
         Policy.objects.create(user=instance)
+
+
+# Keep cached ABAC decisions in step with the database
+
+@receiver(post_save, sender=Policy)
+@receiver(post_delete, sender=Policy)
+def invalidate_policy_cache(sender, instance, **kwargs):
+    invalidate_policy(instance.user_id)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user_policy(sender, instance, **kwargs):
+    invalidate_policy(instance.id)
+    invalidate_org_ids(instance.id)
+
+
+@receiver(post_save, sender=User)
+def bump_user_policy_stamp(sender, instance, created, **kwargs):
+    # username and role are part of the stamped /me/ responses
+    if not created:
+        bump_policy_stamp(instance.id)
+
+
+@receiver(post_save, sender=Organization)
+def bump_member_policy_stamps(sender, instance, created, **kwargs):
+    # Organization names are listed by /user-permissions/
+    if not created:
+        bump_policy_stamp(*instance.users.values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Organization)
+def invalidate_deleted_organization_members(sender, instance, **kwargs):
+    # Memberships go with the organization without m2m_changed
+    user_ids = list(instance.users.values_list("id", flat=True))
+    invalidate_org_ids(*user_ids)
+
+
+@receiver(m2m_changed, sender=User.organizations.through)
+def invalidate_membership_policy(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear", "pre_clear"):
+        return
+    if not reverse:
+        user_ids = [instance.pk]
+    elif pk_set:
+        # organization.users.add(...): pk_set holds user ids
+        user_ids = list(pk_set)
+    elif action == "pre_clear":
+        # organization.users.clear(): pk_set is empty, collect members first
+        user_ids = list(instance.users.values_list("id", flat=True))
+    else:
+        return
+    invalidate_policy(*user_ids)
+    invalidate_org_ids(*user_ids)
+
+
+# Keep cached token lookups (app.authentication) in step with the database
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_token_cache(sender, instance, **kwargs):
+    # Password, is_active and permission flag changes all go through save()
+    invalidate_user_tokens(instance.id)
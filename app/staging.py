@@ -0,0 +1,181 @@
+# staging.py
+# Content-addressed staging area for upload payloads (claim-check pattern).
+#
+# The web process spools the file to disk and only sends a claim reference
+# and its sha256 checksum through the broker; the worker opens the staged
+# file by reference and releases it once ingestion is finished.
+#
+# Layout under ETL_STAGING_DIR:
+#   objects/<sha[:2]>/<sha>   one blob per distinct content
+#   claims/<claim_id>         hard link to the blob, one per queued task
+#   tmp/                      partially written uploads
+# A blob whose only remaining link is its objects/ entry is garbage.
+import hashlib
+import os
+import re
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+
+STAGING_DIR = Path(
+    getattr(settings, "ETL_STAGING_DIR", Path(settings.BASE_DIR) / "staging")
+)
+
+# Claims older than this belong to tasks that never ran and are collected
+STAGING_MAX_AGE = getattr(settings, "ETL_STAGING_MAX_AGE", 24 * 60 * 60)
+
+# Unclaimed blobs younger than this are left alone (a claim may be in flight)
+STAGING_GRACE_PERIOD = 60 * 60
+
+# Re-hash staged files before ingesting them
+STAGING_VERIFY_CHECKSUM = getattr(settings, "ETL_STAGING_VERIFY_CHECKSUM", True)
+
+_HASH_CHUNK = 1024 * 1024
+_REF_RE = re.compile(r"^[0-9a-f]{32}$")
+_SHA_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class StagingError(Exception):
+    pass
+
+
+def _dir(name):
+    path = STAGING_DIR / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _blob_path(checksum):
+    if not _SHA_RE.match(checksum or ""):
+        raise StagingError("Invalid staging checksum")
+    return _dir("objects") / checksum[:2] / checksum
+
+
+def _claim_path(ref):
+    if not _REF_RE.match(ref or ""):
+        raise StagingError("Invalid staging reference")
+    return _dir("claims") / ref
+
+
+def stage_stream(chunks):
+    """
+    Spool an iterable of byte chunks into the staging area.
+
+    Returns (ref, checksum, size): `ref` is a claim id to pass to the task,
+    `checksum` the sha256 hex digest of the content.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    claim = None
+    fd, tmp_path = tempfile.mkstemp(dir=_dir("tmp"))
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                tmp.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+
+        checksum = digest.hexdigest()
+        blob = _blob_path(checksum)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        ref = uuid.uuid4().hex
+
+        # Claim the content before publishing it: once the blob is in place
+        # it already has two links, so a concurrent release() of the same
+        # checksum cannot take it for garbage between the two steps.
+        claim = _claim_path(ref)
+        os.link(tmp_path, claim)
+        # Identical content replaces the blob atomically; existing claims keep
+        # pointing at the previous inode, which holds the same bytes.
+        os.replace(tmp_path, blob)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            # Not published: drop the claim along with the file
+            if claim is not None:
+                claim.unlink(missing_ok=True)
+            os.unlink(tmp_path)
+        raise
+
+    return ref, checksum, size
+
+
+def stage_bytes(data):
+    """Stage an in-memory payload. See stage_stream."""
+    return stage_stream([data])
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def open_staged(ref, checksum):
+    """
+    Resolve a claim to a local file path, verifying the checksum.
+    Raises StagingError if the claim is missing or the content changed.
+    """
+    path = _claim_path(ref)
+    if not path.exists():
+        raise StagingError(f"Staged file {ref} not found")
+    if STAGING_VERIFY_CHECKSUM and file_checksum(path) != checksum:
+        raise StagingError(f"Checksum mismatch for staged file {ref}")
+    return str(path)
+
+
+def staged_size(ref):
+    return _claim_path(ref).stat().st_size
+
+
+def release(ref, checksum):
+    """
+    Drop a claim once its task is done. The blob is removed when no other
+    claim references the same content.
+    """
+    try:
+        _claim_path(ref).unlink()
+    except FileNotFoundError:
+        pass
+
+    blob = _blob_path(checksum)
+    try:
+        if blob.stat().st_nlink <= 1:
+            blob.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def collect_garbage(max_age=None, now=None):
+    """
+    Remove expired claims and unreferenced blobs.
+    Returns a dict with the number of claims and blobs removed.
+    """
+    max_age = STAGING_MAX_AGE if max_age is None else max_age
+    now = now or time.time()
+    removed = {"claims": 0, "blobs": 0, "tmp": 0}
+
+    for claim in _dir("claims").iterdir():
+        if now - claim.stat().st_mtime > max_age:
+            claim.unlink(missing_ok=True)
+            removed["claims"] += 1
+
+    for tmp in _dir("tmp").iterdir():
+        if now - tmp.stat().st_mtime > max_age:
+            tmp.unlink(missing_ok=True)
+            removed["tmp"] += 1
+
+    for blob in _dir("objects").glob("*/*"):
+        stat = blob.stat()
+        if stat.st_nlink <= 1 and now - stat.st_mtime > STAGING_GRACE_PERIOD:
+            blob.unlink(missing_ok=True)
+            removed["blobs"] += 1
+
+    return removed
@@ -1,44 +1,84 @@
-import os
-import io
+import logging
 from datetime import datetime
 
 # Third-Party Imports
-import requests
 import pandas as pd
 from celery import shared_task
-from sqlalchemy import create_engine
-from sqlalchemy.exc import SQLAlchemyError
 
-from app.models import UploadedFile
+from app.models import UploadedFile, User
 from .abac import validate_permissions
-from data.celery import app
-
-API_NINJAS_RANDOM_USER_API_URL = "https://api.api-ninjas.com/v2/randomuser"
-API_NINJAS_KEY = "wauPMBxuKFuh+IbSVCcyVg==IFt4kF99StYj9wp8"
-MYSQL_USER = os.environ.get("MYSQL_USER", "root")
-MYSQL_PASSWORD = os.environ.get("MYSQL_PASSWORD", "root")
-MYSQL_HOST = os.environ.get("MYSQL_HOST", "localhost")
-MYSQL_PORT = os.environ.get("MYSQL_PORT", "3306")
-MYSQL_DB = "new_etl_db"
+from .db import get_engine  # shared pooled engine (one per worker process)
+from .formats import detect_format, iter_dataframe_chunks, read_dataframe
+from .loaders import get_loader
+from .ingestion import INGEST_CHUNK_SIZE, load_chunks, should_stream
+from .progress import publish_progress
+from .results import ETLTask, purge_results
+from .audit import AuditQueueFull, get_audit_writer
+from .staging import StagingError, collect_garbage, open_staged, release, staged_size
 
+logger = logging.getLogger(__name__)
 
-# Helper Functions
-def get_engine():
-    url = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
-    return create_engine(url)
+API_NINJAS_KEY = "wauPMBxuKFuh+IbSVCcyVg==IFt4kF99StYj9wp8"
 
 
 # Celery Tasks
 
 
-@shared_task(bind=True)
-def process_upload_task(self, file_bytes, table_name, user_id=None):
+@shared_task(bind=True, base=ETLTask)
+def process_upload_task(
+    self,
+    file_bytes=None,
+    table_name="uploaded_data",
+    user_id=None,
+    stream=None,
+    chunk_size=None,
+    filename=None,
+    content_type=None,
+    staged_ref=None,
+    checksum=None,
+    loader=None,
+):
     """
-    Process uploaded file bytes and save to MySQL table using pandas.
+    Process an uploaded file and save to MySQL table using pandas.
     ABAC enforced.
+
+    The file is either a claim on the staging area (staged_ref + checksum,
+    see app.staging) or, for small legacy callers, inline file_bytes. Staged
+    files are released when the task finishes, whatever the outcome.
+
+    The format is detected once from the payload and the optional
+    filename/content_type hints, and recorded on UploadedFile.
+
+    stream=True parses and loads the file in fixed-size chunks, each in its
+    own transaction. Progress (stage, rows_parsed, rows_loaded) is
+    published through app.progress either way. When
+    stream is None, payloads above ETL_STREAM_THRESHOLD_BYTES are streamed.
+
+    loader picks the load backend (to_sql, multirow, load_data; see
+    app.loaders), defaulting to ETL_DEFAULT_LOADER.
     """
-    import io
-    from app.models import User, UploadedFile
+    try:
+        if staged_ref:
+            try:
+                source = open_staged(staged_ref, checksum)
+                size = staged_size(staged_ref)
+            except StagingError as e:
+                return {"status": "error", "message": str(e)}
+        else:
+            source = file_bytes or b""
+            size = len(source)
+
+        return _process_upload(
+            self, source, size, table_name, user_id,
+            stream, chunk_size, filename, content_type, loader,
+        )
+    finally:
+        if staged_ref:
+            release(staged_ref, checksum)
+
+
+def _process_upload(task, source, size, table_name, user_id, stream, chunk_size, filename, content_type, loader):
+    from app.models import User
 
     if user_id is None:
         return {"status": "error", "message": "User not provided"}
@@ -52,60 +92,117 @@ def process_upload_task(self, file_bytes, table_name, user_id=None):
         return {"status": "error", "message": "Permission denied by ABAC"}
 
     try:
-        # Try reading as CSV, JSON, XML, Excel
-        parsers = [
-            lambda c: pd.read_csv(io.BytesIO(c)),
-            lambda c: pd.read_json(io.BytesIO(c)),
-            lambda c: pd.read_xml(io.BytesIO(c)),
-            lambda c: pd.read_excel(io.BytesIO(c)),
-        ]
-
-        df = None
-        last_error = None
-
-        for parser in parsers:
-            try:
-                df = parser(file_bytes)
-                df["uploaded_at"] = datetime.utcnow()
-                break
-            except Exception as e:
-                last_error = e
-
-        if df is None:
-            return {
-                "status": "error",
-                "message": f"Unsupported or unreadable file format. Last error: {last_error}",
-            }
+        get_loader(loader)
+        fmt = detect_format(source, filename=filename, content_type=content_type)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+    if should_stream(size, stream):
+        return _process_upload_streaming(
+            task, source, fmt, table_name, user_id, chunk_size, loader
+        )
+
+    try:
+        publish_progress(task, "parsing", table=table_name, format=fmt, rows_parsed=0, rows_loaded=0)
+        df = read_dataframe(source, fmt)
 
         if df.empty:
             return {"status": "error", "message": "File contains no data"}
 
         engine = get_engine()
 
-        #  1. Store actual data
-        df.to_sql(table_name, con=engine, if_exists="append", index=False)
+        #  1. Store actual data (single chunk, single transaction)
+        publish_progress(task, "loading", table=table_name, format=fmt, rows_parsed=len(df), rows_loaded=0)
+        load_chunks([df], table_name, engine, uploaded_at=datetime.utcnow(), loader=loader)
 
-        #  2. UPDATE UploadedFile with row count
-        uploaded_file = (
-            UploadedFile.objects
-            .filter(user_id=user_id, table_name=table_name)
-            .order_by("-uploaded_at")
-            .first()
-        )
-
-        if uploaded_file:
-            uploaded_file.rows_added = len(df)
-            uploaded_file.save()
+        #  2. UPDATE UploadedFile with row count and detected format
+        publish_progress(task, "recording", table=table_name, format=fmt, rows_parsed=len(df), rows_loaded=len(df))
+        _record_upload_result(user_id, table_name, len(df), fmt)
 
         return {
             "status": "success",
             "rows": len(df),
             "table": table_name,
+            "format": fmt,
         }
 
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+
+def _record_upload_result(user_id, table_name, rows, file_format):
+    uploaded_file = (
+        UploadedFile.objects
+        .filter(user_id=user_id, table_name=table_name)
+        .order_by("-uploaded_at")
+        .first()
+    )
+    if uploaded_file:
+        uploaded_file.rows_added = rows
+        uploaded_file.file_format = file_format
+        uploaded_file.save(update_fields=["rows_added", "file_format"])
+
+
+def _process_upload_streaming(task, source, fmt, table_name, user_id, chunk_size=None, loader=None):
+    """
+    Streaming variant of process_upload_task: one chunk in memory at a time,
+    one transaction per chunk, progress published after every chunk parsed
+    and loaded (see app.progress).
+    """
+    chunk_size = chunk_size or INGEST_CHUNK_SIZE
+    counts = {"rows_parsed": 0, "rows_loaded": 0, "chunks": 0}
+
+    def progress(stage):
+        publish_progress(
+            task, stage, table=table_name, format=fmt, chunk_size=chunk_size, **counts
+        )
+
+    def parsed_chunks():
+        progress("parsing")
+        for chunk in iter_dataframe_chunks(source, fmt, chunk_size):
+            counts["rows_parsed"] += len(chunk)
+            progress("loading")
+            yield chunk
+
+    def on_progress(rows_loaded, chunk_count):
+        counts["rows_loaded"] = rows_loaded
+        counts["chunks"] = chunk_count
+        progress("loading")
+
+    rows_loaded = 0
+    try:
+        rows_loaded = load_chunks(
+            parsed_chunks(),
+            table_name,
+            get_engine(),
+            uploaded_at=datetime.utcnow(),
+            on_progress=on_progress,
+            loader=loader,
+        )
+    except Exception as e:
+        rows_loaded = getattr(e, "rows_loaded", rows_loaded)
+        _record_upload_result(user_id, table_name, rows_loaded, fmt)
+        return {
+            "status": "error",
+            "message": str(e),
+            "rows": rows_loaded,
+            "table": table_name,
+        }
+
+    if rows_loaded == 0:
+        return {"status": "error", "message": "File contains no data"}
+
+    progress("recording")
+    _record_upload_result(user_id, table_name, rows_loaded, fmt)
+
+    return {
+        "status": "success",
+        "rows": rows_loaded,
+        "table": table_name,
+        "format": fmt,
+        "mode": "stream",
+    }
+
 # =========================
 # Scenario 2: Real-Time API Ingestion with ABAC
 # =========================
@@ -114,58 +211,63 @@ def process_upload_task(self, file_bytes, table_name, user_id=None):
 
 
 # Task: Log file upload to MySQL table if user has 'read' permission
-from celery import shared_task
-from datetime import datetime
-from app.models import User
 
 
-@shared_task(bind=True)
+@shared_task(bind=True, base=ETLTask, max_retries=5)
 def log_file_upload_task(self, user_id, file_type, file_count, organization):
     """
     Log file upload details to MySQL table.
     This task ALWAYS logs uploads (no ABAC restriction).
+
+    The row is handed to this worker's buffered audit writer (app.audit),
+    which inserts events in batches; it is committed within
+    ETL_AUDIT_FLUSH_INTERVAL seconds, or at worker shutdown.
     """
 
     if user_id is None:
         return {"status": "error", "message": "User not provided"}
 
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    username = User.objects.filter(id=user_id).values_list("username", flat=True).first()
+    if username is None:
         return {"status": "error", "message": "User not found"}
 
     try:
-        engine = get_engine()
-
-        # ✅ Use transaction (AUTO-COMMIT)
-        with engine.begin() as conn:
-            insert_sql = (
-                "INSERT INTO file_upload_log "
-                "(user_name, file_type, file_count, organization, upload_datetime) "
-                "VALUES (%s, %s, %s, %s, %s)"
-            )
-            conn.execute(
-                insert_sql,
-                (user.username, file_type, file_count, organization, datetime.now()),
-            )
-
-        return {
-            "status": "success",
-            "message": "File upload logged",
-            "user": user.username,
-            "rows": file_count,
-        }
-
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
-
-@shared_task(bind=True)
+        get_audit_writer().write(
+            user_name=username,
+            file_type=file_type,
+            file_count=file_count,
+            organization=organization,
+            upload_datetime=datetime.now(),
+        )
+    except AuditQueueFull as e:
+        # Backpressure: try again once the writer has caught up
+        raise self.retry(exc=e, countdown=5)
+
+    return {
+        "status": "success",
+        "message": "File upload logged",
+        "user": username,
+        "rows": file_count,
+    }
+
+@shared_task(bind=True, base=ETLTask)
 def fetch_random_users_task(self, count, user_id):
     """
     Fetch random users from API and store in MySQL.
+
+    Large counts are fetched as concurrent pages with retries (see
+    app.fetchers); each page is appended to the table as it arrives, in
+    its own transaction. If a page fails for good, the pages already
+    stored stay and the error reports how many rows they hold.
+
+    With ETL_RANDOM_USER_RESERVOIR_ENABLED, users are first moved from the
+    pre-fetched reservoir (app.reservoir) and only the remainder is fetched
+    live.
     """
     from app.models import User
-    import sqlalchemy
+    from .fetchers import RANDOM_USER_API_KEY, iter_random_users
+    from .loaders import load_dataframe
+    from .reservoir import RESERVOIR_ENABLED, ReservoirError, move_to_table
 
     try:
         user = User.objects.get(id=user_id)
@@ -175,36 +277,92 @@ def fetch_random_users_task(self, count, user_id):
     if not validate_permissions(user, "upload"):
         return {"status": "error", "message": "Permission denied by ABAC"}
 
+    table_name = "random_users"
+    rows = 0
+    from_reservoir = 0
     try:
-        headers = {"X-Api-Key": API_NINJAS_KEY}
-        response = requests.get(
-            API_NINJAS_RANDOM_USER_API_URL,
-            headers=headers,
-            params={"count": count},
-            timeout=10,
-        )
-        response.raise_for_status()
-
-        users = response.json()
-
-        # ✅ CRITICAL FIX
-        if not isinstance(users, list):
-            return {"status": "error", "message": "API returned unexpected format"}
-
-        df = pd.DataFrame(users)
-        df["fetched_at"] = datetime.utcnow()
-
         engine = get_engine()
-        table_name = "random_users"
-
-        df.to_sql(table_name, con=engine, if_exists="append", index=False)
+        if RESERVOIR_ENABLED:
+            try:
+                from_reservoir = move_to_table(
+                    count, table_name, engine,
+                    on_batch=lambda moved: publish_progress(
+                        self, "loading", table=table_name, rows_requested=count, rows_loaded=moved
+                    ),
+                )
+            except ReservoirError as e:
+                # Misconfigured reservoir: serve everything live
+                logger.error("Random-user reservoir skipped: %s", e)
+            rows = from_reservoir
+
+        for users in iter_random_users(count - rows, api_key=RANDOM_USER_API_KEY or API_NINJAS_KEY):
+            if not users:
+                continue
+            df = pd.DataFrame(users)
+            df["fetched_at"] = datetime.utcnow()
+            with engine.begin() as conn:
+                load_dataframe(df, table_name, conn)
+            rows += len(df)
+            publish_progress(self, "loading", table=table_name, rows_requested=count, rows_loaded=rows)
 
         return {
             "status": "success",
             "message": f"Random user data successfully stored in table '{table_name}'",
             "table": table_name,
-            "rows": len(df),
+            "rows": rows,
+            "from_reservoir": from_reservoir,
         }
 
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": str(e),
+            "table": table_name,
+            "rows": rows,
+            "from_reservoir": from_reservoir,
+        }
+
+
+@shared_task(bind=True)
+def refill_random_user_reservoir_task(self, target=None):
+    """
+    Periodic top-up of the random-user reservoir to
+    ETL_RANDOM_USER_RESERVOIR_TARGET users. Does nothing while the
+    reservoir is disabled or another refill is running.
+    """
+    from .fetchers import RANDOM_USER_API_KEY
+    from .reservoir import RESERVOIR_ENABLED, check_database, refill
+
+    if not RESERVOIR_ENABLED:
+        return {"status": "skipped", "message": "Reservoir disabled"}
+    try:
+        # Users the fetch task could never move are not worth fetching
+        check_database(get_engine())
+        added = refill(target, api_key=RANDOM_USER_API_KEY or API_NINJAS_KEY)
     except Exception as e:
         return {"status": "error", "message": str(e)}
+    if added is None:
+        return {"status": "skipped", "message": "Refill already running"}
+    return {"status": "success", "added": added}
+
+
+@shared_task(bind=True)
+def purge_staged_files_task(self, max_age=None):
+    """
+    Periodic cleanup of the upload staging area: expired claims (tasks that
+    never ran) and blobs no claim references any more.
+    """
+    removed = collect_garbage(max_age=max_age)
+    return {"status": "success", "removed": removed}
+
+
+@shared_task(bind=True)
+def purge_task_results_task(self, retention=None, batch_size=None, max_batches=None):
+    """
+    Periodic retention job for the django-db result backend: deletes (and
+    archives, if ETL_TASK_RESULT_ARCHIVE_DIR is set) results older than
+    ETL_TASK_RESULT_RETENTION in bounded batches. A run that stops at its
+    batch limit is picked up by the next one.
+    """
+    outcome = purge_results(retention=retention, batch_size=batch_size, max_batches=max_batches)
+    return {"status": "success", **outcome}
@@ -0,0 +1,34 @@
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from app.models import Policy, User
+
+
+def make_user(username, organizations=(), **flags):
+    """A user whose policy grants the given can_* flags."""
+    user = User.objects.create_user(username, password="secret")
+    policy = Policy.objects.get(user=user)
+    for field, value in flags.items():
+        setattr(policy, field, value)
+    policy.save()
+    if organizations:
+        user.organizations.add(*organizations)
+    return user
+
+
+def client_for(user):
+    """An API client authenticated with `user`'s token."""
+    client = APIClient()
+    if user is not None:
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+class CacheClearingMixin:
+    """Start every test with an empty cache (ABAC, tokens, stamps, progress)."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
@@ -0,0 +1,252 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from app import abac
+from app.models import POLICY_PERMISSION_BITS, Organization, Policy, User
+from app.tests.helpers import CacheClearingMixin, client_for, make_user
+
+
+class PermissionBitsTests(CacheClearingMixin, TestCase):
+    def test_save_compiles_the_flags(self):
+        user = make_user("alice", can_upload=True, can_delete_user=True)
+        policy = Policy.objects.get(user=user)
+        self.assertEqual(
+            policy.permission_bits,
+            POLICY_PERMISSION_BITS["can_upload"] | POLICY_PERMISSION_BITS["can_delete_user"],
+        )
+
+        policy.can_upload = False
+        policy.save(update_fields=["can_upload"])
+        policy.refresh_from_db()
+        self.assertEqual(policy.permission_bits, POLICY_PERMISSION_BITS["can_delete_user"])
+
+    def test_every_action_has_its_own_bit(self):
+        self.assertEqual(set(abac.ACTION_FIELDS.values()), set(POLICY_PERMISSION_BITS))
+        bits = list(abac.ACTION_BITS.values())
+        self.assertEqual(len(set(bits)), len(bits))
+        for bit in bits:
+            self.assertEqual(bit & (bit - 1), 0, bit)
+
+    def test_permission_mask(self):
+        self.assertEqual(abac.permission_mask(), 0)
+        self.assertEqual(
+            abac.permission_mask("read", "upload"),
+            abac.ACTION_BITS["read"] | abac.ACTION_BITS["upload"],
+        )
+        with self.assertRaisesMessage(ValueError, "Unknown action 'fly'."):
+            abac.permission_mask("read", "fly")
+
+    def test_users_with_permissions(self):
+        both = make_user("both", can_read=True, can_upload=True)
+        make_user("reader", can_read=True)
+        make_user("nobody")
+        no_policy = make_user("no-policy", can_read=True)
+        Policy.objects.filter(user=no_policy).delete()
+
+        def usernames(*actions, **kwargs):
+            return set(abac.users_with_permissions(*actions, **kwargs).values_list("username", flat=True))
+
+        self.assertEqual(usernames("read"), {"both", "reader"})
+        self.assertEqual(usernames("read", "upload"), {"both"})
+        self.assertEqual(usernames("read", queryset=User.objects.exclude(pk=both.pk)), {"reader"})
+        # Agrees with the per-user check
+        for user in User.objects.all():
+            with self.subTest(user=user.username):
+                self.assertEqual(
+                    user.username in usernames("read"), abac.validate_permissions(user, "read")
+                )
+
+
+class EvaluatePermissionsTests(CacheClearingMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.acme = Organization.objects.create(name="acme")
+        self.globex = Organization.objects.create(name="globex")
+        self.user = make_user("alice", organizations=[self.acme], can_read=True)
+        self.checks = [
+            "read",
+            "upload",
+            "fly",
+            ("read", {"organization": self.acme.id}),
+            ("read", {"organization": self.globex.id}),
+            ("read", {"target_user_id": self.user.id}),
+            ("read", {"target_user_id": self.user.id + 1}),
+        ]
+
+    def test_matches_validate_permissions(self):
+        expected = [
+            abac.validate_permissions(self.user, *((check,) if isinstance(check, str) else check))
+            for check in self.checks
+        ]
+        self.assertEqual(expected, [True, False, False, True, False, True, False])
+        self.assertEqual(abac.evaluate_permissions(self.user, self.checks), expected)
+
+    def test_one_policy_and_one_membership_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            abac.evaluate_permissions(self.user, self.checks * 10)
+        self.assertEqual(len(queries), 2)
+
+    def test_endpoint(self):
+        client = client_for(self.user)
+        response = client.post(
+            "/permissions/evaluate/",
+            {"checks": [
+                {"action": "read"},
+                {"action": "read", "resource": {"organization": self.globex.id}},
+            ]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["allowed"] for r in response.data["results"]], [True, False])
+
+        for body in ({}, {"checks": []}, {"checks": [{"resource": {}}]},
+                     {"checks": [{"action": "read", "resource": 1}]}):
+            with self.subTest(body=body):
+                response = client.post("/permissions/evaluate/", body, format="json")
+                self.assertEqual(response.status_code, 400)
+
+    def test_endpoint_rejects_malformed_resources(self):
+        client = client_for(self.user)
+        checks = [
+            {"action": "read", "resource": {"organization": str(self.acme.id)}},
+            {"action": "fly"},
+            {"action": "read", "resource": {"organization": [self.acme.id]}},
+            {"action": "read", "resource": {"organization": {"id": 1}}},
+            {"action": "read", "resource": {"organization": True}},
+            {"action": "read", "resource": {"target_user_id": "1.5"}},
+        ]
+        response = client.post("/permissions/evaluate/", {"checks": checks}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e["index"] for e in response.data["errors"]], [1, 2, 3, 4, 5])
+
+        # Digit strings are accepted as ids
+        response = client.post("/permissions/evaluate/", {"checks": checks[:1]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["allowed"], True)
+        self.assertEqual(response.data["results"][0]["resource"], {"organization": self.acme.id})
+
+
+class PolicyCacheTests(CacheClearingMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("alice", can_read=True)
+
+    def test_cached_across_calls_and_invalidated_on_save(self):
+        self.assertTrue(abac.validate_permissions(self.user, "read"))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(abac.validate_permissions(self.user, "read"))
+        self.assertEqual(len(queries), 0)
+
+        policy = Policy.objects.get(user=self.user)
+        policy.can_read = False
+        policy.save()
+        self.assertFalse(abac.validate_permissions(self.user, "read"))
+
+    def test_request_cache(self):
+        token = abac.start_request_cache()
+        try:
+            abac.get_policy_bits(self.user)
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                abac.get_policy_bits(self.user)
+            self.assertEqual(len(queries), 0)
+            # Invalidation reaches the current request's cache too
+            Policy.objects.filter(user=self.user).update(can_read=False, permission_bits=0)
+            abac.invalidate_policy(self.user.id)
+            self.assertEqual(abac.get_policy_bits(self.user), 0)
+        finally:
+            abac.end_request_cache(token)
+
+    def test_deleted_policy_denies(self):
+        abac.validate_permissions(self.user, "read")
+        Policy.objects.filter(user=self.user).delete()
+        self.assertFalse(abac.validate_permissions(self.user, "read"))
+
+
+class MembershipCacheTests(CacheClearingMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.acme = Organization.objects.create(name="acme")
+        self.globex = Organization.objects.create(name="globex")
+        self.user = make_user("alice", organizations=[self.acme])
+
+    def assertOrgs(self, *orgs):
+        self.assertEqual(abac.get_org_ids(self.user), frozenset(org.id for org in orgs))
+
+    def test_cached_as_frozenset(self):
+        self.assertOrgs(self.acme)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertOrgs(self.acme)
+        self.assertEqual(len(queries), 0)
+
+    def test_every_kind_of_membership_change_invalidates(self):
+        self.assertOrgs(self.acme)
+        self.user.organizations.add(self.globex)
+        self.assertOrgs(self.acme, self.globex)
+        self.user.organizations.remove(self.acme)
+        self.assertOrgs(self.globex)
+        self.acme.users.add(self.user)
+        self.assertOrgs(self.acme, self.globex)
+        self.globex.users.clear()
+        self.assertOrgs(self.acme)
+        self.acme.delete()
+        self.assertOrgs()
+
+    def test_version_survives_an_evicted_counter(self):
+        self.assertOrgs(self.acme)
+        cache.delete(abac._org_version_key(self.user.id))
+        self.user.organizations.add(self.globex)
+        self.assertOrgs(self.acme, self.globex)
+
+
+@override_settings(ETL_SHARED_CACHE=None)
+class ProcessLocalCacheTests(CacheClearingMixin, TestCase):
+    """With LocMemCache another process's changes must be seen at once."""
+
+    def setUp(self):
+        super().setUp()
+        self.acme = Organization.objects.create(name="acme")
+        self.user = make_user("alice", can_read=True)
+
+    def test_detection(self):
+        self.assertFalse(abac.shared_cache_enabled())
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+        with override_settings(CACHES=redis):
+            self.assertTrue(abac.shared_cache_enabled())
+        with override_settings(ETL_SHARED_CACHE=True):
+            self.assertTrue(abac.shared_cache_enabled())
+
+    def test_nothing_is_cached_across_requests(self):
+        self.assertTrue(abac.validate_permissions(self.user, "read"))
+        self.assertEqual(abac.get_org_ids(self.user), frozenset())
+        # Changes made elsewhere send no signal to this process
+        Policy.objects.filter(user=self.user).update(can_read=False, permission_bits=0)
+        User.organizations.through.objects.create(user=self.user, organization=self.acme)
+
+        self.assertFalse(abac.validate_permissions(self.user, "read"))
+        self.assertEqual(abac.get_org_ids(self.user), frozenset({self.acme.id}))
+        self.assertIsNone(abac.policy_stamp(self.user))
+
+    def test_request_cache_still_applies(self):
+        token = abac.start_request_cache()
+        try:
+            abac.validate_permissions(self.user, "read")
+            with CaptureQueriesContext(connection) as queries:
+                abac.validate_permissions(self.user, "read")
+            self.assertEqual(len(queries), 0)
+        finally:
+            abac.end_request_cache(token)
+
+    def test_system_check_warns(self):
+        from app.checks import check_shared_cache
+
+        self.assertEqual([w.id for w in check_shared_cache(None)], ["app.W001"])
+        with override_settings(ETL_SHARED_CACHE=True):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_responses_are_not_tagged(self):
+        response = client_for(self.user).get("/me/", HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
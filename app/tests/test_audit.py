@@ -0,0 +1,111 @@
+import datetime
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+from sqlalchemy import create_engine, event, text
+
+from app.audit import AuditQueueFull, AuditWriter
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class AuditWriterTests(SimpleTestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.engine = create_engine(f"sqlite:///{os.path.join(tmpdir.name, 'audit.sqlite3')}")
+        self.addCleanup(self.engine.dispose)
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE file_upload_log (id INTEGER PRIMARY KEY, user_name TEXT, "
+                "file_type TEXT, file_count INTEGER, organization TEXT, upload_datetime TIMESTAMP)"
+            ))
+
+        self.statements = []
+
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("INSERT"):
+                self.statements.append((statement, executemany))
+
+    def writer(self, **options):
+        writer = AuditWriter(engine=self.engine, **options)
+        self.addCleanup(writer.close)
+        return writer
+
+    def write(self, writer, n, start=0):
+        for i in range(start, start + n):
+            writer.write(
+                user_name=f"user{i}", file_type="csv", file_count=1,
+                organization="acme", upload_datetime=datetime.datetime(2026, 1, 1),
+            )
+
+    def rows(self):
+        with self.engine.connect() as conn:
+            return conn.execute(text("SELECT user_name FROM file_upload_log ORDER BY id")).scalars().all()
+
+    def test_a_batch_is_one_multi_row_insert(self):
+        writer = self.writer(batch_size=3, flush_interval=60)
+        self.write(writer, 3)
+        self.assertTrue(wait_for(lambda: writer.written == 3))
+
+        self.assertEqual(len(self.statements), 1)
+        statement, executemany = self.statements[0]
+        self.assertFalse(executemany)
+        self.assertEqual(statement.count("?, ?, ?, ?, ?"), 3)
+        self.assertEqual(self.rows(), ["user0", "user1", "user2"])
+
+    def test_full_batch_is_written_before_the_interval(self):
+        writer = self.writer(batch_size=2, flush_interval=60)
+        self.write(writer, 5)
+        # Two full batches go out at once; the fifth event waits for more
+        self.assertTrue(wait_for(lambda: writer.written == 4))
+        time.sleep(0.2)
+        self.assertEqual(writer.written, 4)
+
+    def test_partial_batch_is_written_after_the_interval(self):
+        writer = self.writer(batch_size=100, flush_interval=0.1)
+        self.write(writer, 2)
+        self.assertTrue(wait_for(lambda: writer.written == 2))
+        self.assertEqual(len(self.statements), 1)
+
+    def test_close_writes_everything(self):
+        writer = self.writer(batch_size=100, flush_interval=60)
+        self.write(writer, 7)
+        self.assertTrue(wait_for(lambda: writer.pending() < 7))  # the thread holds a batch
+
+        start = time.monotonic()
+        writer.close()
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(self.rows(), [f"user{i}" for i in range(7)])
+        self.assertEqual(writer.written, 7)
+
+    def test_full_queue_applies_backpressure(self):
+        writer = self.writer(max_queue=2, put_timeout=0.05)
+        with mock.patch.object(writer, "start"):  # no consumer
+            self.write(writer, 2)
+            with self.assertRaises(AuditQueueFull):
+                self.write(writer, 1, start=2)
+        writer.flush()
+        self.assertEqual(self.rows(), ["user0", "user1"])
+
+    def test_failing_batch_is_dropped_after_retries(self):
+        with self.engine.begin() as conn:
+            conn.execute(text("DROP TABLE file_upload_log"))
+        writer = self.writer()
+        with mock.patch.object(writer, "start"), \
+                mock.patch("app.audit.time.sleep"), \
+                self.assertLogs("app.audit", "ERROR"):
+            self.write(writer, 3)
+            writer.flush()
+        self.assertEqual((writer.written, writer.dropped), (0, 3))
@@ -0,0 +1,77 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from app.authentication import _token_key
+from app.models import User
+from app.tests.helpers import CacheClearingMixin, client_for, make_user
+
+
+class CachedTokenAuthenticationTests(CacheClearingMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("alice")
+        self.client = client_for(self.user)
+
+    def get(self):
+        return self.client.get("/me/", HTTP_ACCEPT="application/json")
+
+    def test_lookup_is_cached(self):
+        self.assertEqual(self.get().status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get().status_code, 200)
+        self.assertFalse(
+            [q["sql"] for q in queries if "authtoken_token" in q["sql"]]
+        )
+
+    def test_cache_key_does_not_contain_the_token(self):
+        key = Token.objects.get(user=self.user).key
+        self.assertNotIn(key, _token_key(key))
+
+    def test_deleted_token_is_rejected(self):
+        self.assertEqual(self.get().status_code, 200)
+        Token.objects.get(user=self.user).delete()
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.get().status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_deleted_user_is_rejected(self):
+        self.assertEqual(self.get().status_code, 200)
+        self.user.delete()
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_unknown_token_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + "0" * 40)
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_cache_holds_ids_only(self):
+        self.assertEqual(self.get().status_code, 200)
+        key = Token.objects.get(user=self.user).key
+        self.assertEqual(cache.get(_token_key(key)), self.user.pk)
+
+    def test_user_changes_apply_without_signals(self):
+        # Another process deactivating the user sends no signal here
+        self.assertEqual(self.get().status_code, 200)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_user_is_read_once_per_request(self):
+        self.get()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get().status_code, 200)
+        user_reads = [q["sql"] for q in queries if 'FROM "app_user"' in q["sql"]]
+        self.assertEqual(len(user_reads), 1, user_reads)
+
+    @override_settings(ETL_SHARED_CACHE=False)
+    def test_process_local_cache_is_not_used(self):
+        self.assertEqual(self.get().status_code, 200)
+        key = Token.objects.get(user=self.user).key
+        self.assertIsNone(cache.get(_token_key(key)))
+        Token.objects.filter(key=key).delete()
+        self.assertEqual(self.get().status_code, 401)
@@ -0,0 +1,79 @@
+import os
+from types import SimpleNamespace
+from unittest import mock
+
+from celery.app.amqp import Queues
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from data.celery import app, apply_worker_profile, select_profile_queues
+
+
+class TaskRoutingTests(SimpleTestCase):
+    def route(self, name):
+        return app.amqp.router.route({}, name, args=(), kwargs={})
+
+    def test_tasks_go_to_their_queues(self):
+        expected = {
+            "app.tasks.process_upload_task": "ingest",
+            "app.tasks.fetch_random_users_task": "api_fetch",
+            "app.tasks.refill_random_user_reservoir_task": "api_fetch",
+            "app.tasks.log_file_upload_task": "logging",
+        }
+        for name, queue in expected.items():
+            with self.subTest(task=name):
+                self.assertEqual(self.route(name)["queue"].name, queue)
+        self.assertEqual(self.route("app.tasks.purge_staged_files_task")["queue"].name, "celery")
+
+    def test_priorities(self):
+        self.assertEqual(self.route("app.tasks.log_file_upload_task")["priority"], 8)
+        self.assertEqual(self.route("app.tasks.refill_random_user_reservoir_task")["priority"], 2)
+        self.assertNotIn("priority", self.route("app.tasks.process_upload_task"))
+        self.assertEqual(app.conf.task_default_priority, 5)
+
+    def test_routed_queues_accept_priorities(self):
+        queues = {queue.name: queue for queue in app.conf.task_queues}
+        for name in ("ingest", "api_fetch", "logging"):
+            with self.subTest(queue=name):
+                self.assertEqual(queues[name].queue_arguments, {"x-max-priority": 10})
+
+
+class WorkerProfileTests(SimpleTestCase):
+    def start_worker(self, profile, consume_from=None):
+        """Run both profile signals as `celery worker` would; return (conf, queues)."""
+        conf = SimpleNamespace(worker_concurrency=None, worker_prefetch_multiplier=4)
+        queues = Queues(app.conf.task_queues)
+        if consume_from:
+            queues.select(consume_from)
+        instance = SimpleNamespace(app=SimpleNamespace(amqp=SimpleNamespace(queues=queues)))
+        with mock.patch.dict(os.environ, {"ETL_WORKER_PROFILE": profile or ""}):
+            apply_worker_profile(conf=conf)
+            select_profile_queues(sender="worker@host", instance=instance)
+        return conf, sorted(queues.consume_from)
+
+    def test_each_profile(self):
+        expected = {
+            "ingest": (["ingest"], 2, 1),
+            "api_fetch": (["api_fetch"], 8, 4),
+            "logging": (["celery", "logging"], 4, 16),
+        }
+        self.assertEqual(set(expected), set(settings.ETL_WORKER_PROFILES))
+        for profile, (queues, concurrency, prefetch) in expected.items():
+            with self.subTest(profile=profile):
+                conf, consumed = self.start_worker(profile)
+                self.assertEqual(consumed, queues)
+                self.assertEqual(conf.worker_concurrency, concurrency)
+                self.assertEqual(conf.worker_prefetch_multiplier, prefetch)
+
+    def test_no_profile_consumes_every_queue(self):
+        conf, consumed = self.start_worker(None)
+        self.assertEqual(consumed, ["api_fetch", "celery", "ingest", "logging"])
+        self.assertEqual((conf.worker_concurrency, conf.worker_prefetch_multiplier), (None, 4))
+
+    def test_command_line_queues_win(self):
+        _, consumed = self.start_worker("logging", consume_from=["ingest"])
+        self.assertEqual(consumed, ["ingest"])
+
+    def test_unknown_profile(self):
+        with self.assertRaisesMessage(ValueError, "Unknown ETL_WORKER_PROFILE 'gpu'"):
+            self.start_worker("gpu")
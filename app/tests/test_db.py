@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import tempfile
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+from sqlalchemy import text
+
+from app import db
+
+
+class EngineRegistryTests(SimpleTestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.urls = [f"sqlite:///{os.path.join(tmpdir.name, name)}" for name in ("a.db", "b.db")]
+        patcher = mock.patch.object(db, "_engines", {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Cleanups run last-in first-out: dispose the test engines while patched
+        self.addCleanup(db.dispose_engines)
+
+    def test_one_engine_per_url(self):
+        first = db.get_engine(self.urls[0])
+        self.assertIs(db.get_engine(self.urls[0]), first)
+        self.assertIsNot(db.get_engine(self.urls[1]), first)
+        self.assertIsInstance(first.pool, db.TimedQueuePool)
+
+    def test_concurrent_first_use_builds_one_engine(self):
+        engines = []
+        threads = [
+            threading.Thread(target=lambda: engines.append(db.get_engine(self.urls[0])))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(engine) for engine in engines}), 1)
+
+    def test_dispose_after_fork_keeps_the_parents_sockets(self):
+        engine = db.get_engine(self.urls[0])
+        with mock.patch.object(engine, "dispose") as dispose:
+            db.dispose_engines(close=False)
+        dispose.assert_called_once_with(close=False)
+
+    def test_pool_stats(self):
+        engine = db.get_engine(self.urls[0])
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            [stats] = db.pool_stats().values()
+            self.assertEqual(stats["checked_out"], 1)
+        [stats] = db.pool_stats().values()
+        self.assertEqual(stats["checked_out"], 0)
+        self.assertEqual(stats["checked_in"], 1)
+        self.assertEqual(stats["waits"], 1)
+        self.assertEqual(stats["pid"], os.getpid())
+
+
+class TimedQueuePoolTests(SimpleTestCase):
+    def test_wait_stats_under_concurrency(self):
+        pool = db.TimedQueuePool(
+            lambda: sqlite3.connect(":memory:", check_same_thread=False),
+            pool_size=2, max_overflow=0, timeout=30,
+        )
+        self.addCleanup(pool.dispose)
+
+        def work():
+            for _ in range(200):
+                pool.connect().close()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        count, total, maximum = pool.wait_stats()
+        self.assertEqual(count, 8 * 200)
+        self.assertGreaterEqual(total, maximum)
+
+
+class PoolStatsLoggingTests(SimpleTestCase):
+    def test_logs_on_schedule_until_stopped(self):
+        self.addCleanup(db.stop_pool_stats_logging)
+        stats = {"sqlite://": {"waits": 3}}
+        logged = threading.Event()
+        with mock.patch.object(db, "pool_stats", return_value=stats), \
+                mock.patch.object(db.logger, "info", side_effect=lambda *a: logged.set()) as info:
+            db.start_pool_stats_logging(interval=0.01)
+            self.assertTrue(logged.wait(5))
+            db.stop_pool_stats_logging()
+        self.assertIn('"waits": 3', info.call_args.args[1])
+
+    def test_interval_zero_disables(self):
+        with mock.patch.object(db.threading, "Thread") as thread:
+            db.start_pool_stats_logging(interval=0)
+        thread.assert_not_called()
+
+    def test_worker_children_start_the_reporter(self):
+        from data.celery import init_worker_engine, shutdown_worker_engine
+
+        with mock.patch("app.db.dispose_engines") as dispose, \
+                mock.patch("app.db.get_engine"), \
+                mock.patch("app.audit.reset_audit_writer"), \
+                mock.patch("app.db.start_pool_stats_logging") as start:
+            init_worker_engine()
+        dispose.assert_called_once_with(close=False)
+        start.assert_called_once_with()
+
+        with mock.patch("app.db.dispose_engines"), \
+                mock.patch("app.audit.close_audit_writer"), \
+                mock.patch("app.db.stop_pool_stats_logging") as stop:
+            shutdown_worker_engine()
+        stop.assert_called_once_with()
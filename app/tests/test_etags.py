@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from app import abac
+from app.models import Organization, Policy
+from app.tests.helpers import CacheClearingMixin, client_for, make_user
+
+ENDPOINTS = ("/me/", "/my-features/", "/user-permissions/")
+
+
+class PolicyETagTests(CacheClearingMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.org = Organization.objects.create(name="acme")
+        self.user = make_user("reader", can_read=True)
+        self.client = client_for(self.user)
+
+    def get(self, path, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(path, HTTP_ACCEPT="application/json", **headers)
+
+    def test_matching_etag_is_a_304_with_only_the_user_read(self):
+        for path in ENDPOINTS:
+            with self.subTest(path=path):
+                response = self.get(path)
+                self.assertEqual(response.status_code, 200)
+                etag = response["ETag"]
+                self.get(path, etag)  # warm the token cache
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.get(path, etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etag)
+                # Authentication reads the user row; nothing else is queried
+                self.assertEqual(len(queries), 1, [q["sql"] for q in queries])
+                self.assertIn('"app_user"', queries[0]["sql"])
+                self.assertEqual(self.get(path, "W/" + etag).status_code, 304)
+
+    def test_endpoints_have_distinct_tags(self):
+        tags = {self.get(path)["ETag"] for path in ENDPOINTS}
+        self.assertEqual(len(tags), len(ENDPOINTS))
+
+    def assertChangesTag(self, change, path="/user-permissions/"):
+        etag = self.get(path)["ETag"]
+        change()
+        response = self.get(path, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        return response
+
+    def test_policy_change_invalidates(self):
+        def grant_upload():
+            policy = Policy.objects.get(user=self.user)
+            policy.can_upload = True
+            policy.save()
+
+        response = self.assertChangesTag(grant_upload)
+        self.assertIn("can_upload", response.data["allowed_operations"])
+
+    def test_bulk_permission_assignment_invalidates(self):
+        from app.provisioning import assign_permissions
+
+        manager = make_user("manager", can_set_permissions=True)
+        self.assertChangesTag(
+            lambda: assign_permissions(manager, [{"user_id": self.user.id, "allowed_operations": ["upload"]}])
+        )
+
+    def test_membership_changes_invalidate(self):
+        response = self.assertChangesTag(lambda: self.user.organizations.add(self.org))
+        self.assertEqual(response.data["organizations"], ["acme"])
+        response = self.assertChangesTag(lambda: self.org.users.clear())
+        self.assertEqual(response.data["organizations"], [])
+
+    def test_organization_rename_and_delete_invalidate(self):
+        self.user.organizations.add(self.org)
+
+        def rename():
+            self.org.name = "acme-2"
+            self.org.save()
+
+        self.assertChangesTag(rename)
+        response = self.assertChangesTag(self.org.delete)
+        self.assertEqual(response.data["organizations"], [])
+
+    def test_user_change_invalidates(self):
+        def rename():
+            self.user.role = "analyst"
+            self.user.save()
+
+        response = self.assertChangesTag(rename, path="/me/")
+        self.assertEqual(response.data["role"], "analyst")
+
+    def test_stamp_expires_with_the_policy_cache(self):
+        # A bump in another process (per-process cache) is not seen here;
+        # the stamp must expire rather than serve 304s forever
+        with mock.patch.object(cache, "add", wraps=cache.add) as add:
+            abac.policy_stamp(self.user)
+        [call] = add.call_args_list
+        self.assertEqual(call.args[2], abac.POLICY_CACHE_TIMEOUT)
+        self.assertIsNotNone(call.args[2])
+
+        first = abac.policy_stamp(self.user)
+        cache.delete(f"abac:policy-stamp:{self.user.id}")  # as on expiry
+        self.assertNotEqual(abac.policy_stamp(self.user), first)
+
+    def test_anonymous_gets_401_not_304(self):
+        response = client_for(None).get("/me/", HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(response.status_code, 401)
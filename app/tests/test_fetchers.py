@@ -0,0 +1,75 @@
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from app import fetchers
+
+
+def response(status_code, body=None, headers=None):
+    r = mock.Mock(status_code=status_code, headers=headers or {})
+    r.json.return_value = body
+    r.raise_for_status.side_effect = (
+        requests.HTTPError(f"HTTP {status_code}") if status_code >= 400 else None
+    )
+    return r
+
+
+class FetchPageTests(SimpleTestCase):
+    def test_retries_transient_failures(self):
+        session = mock.Mock()
+        session.get.side_effect = [
+            requests.ConnectionError("reset"),
+            response(429, headers={"Retry-After": "2"}),
+            response(200, [{"name": "a"}]),
+        ]
+        sleep = mock.Mock()
+        self.assertEqual(fetchers.fetch_page(session, 1, url="http://x", sleep=sleep), [{"name": "a"}])
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(sleep.call_args.args, (2.0,))
+
+    def test_gives_up(self):
+        session = mock.Mock()
+        session.get.return_value = response(503)
+        sleep = mock.Mock()
+        with self.assertRaisesMessage(fetchers.FetchError, "Giving up after 3 attempts (HTTP 503)"):
+            fetchers.fetch_page(session, 1, url="http://x", max_attempts=3, sleep=sleep)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_client_errors_are_not_retried(self):
+        session = mock.Mock()
+        session.get.return_value = response(401)
+        with self.assertRaises(requests.HTTPError):
+            fetchers.fetch_page(session, 1, url="http://x", sleep=mock.Mock())
+        self.assertEqual(session.get.call_count, 1)
+
+    def test_unexpected_body(self):
+        session = mock.Mock()
+        session.get.return_value = response(200, {"error": "nope"})
+        with self.assertRaises(fetchers.FetchError):
+            fetchers.fetch_page(session, 1, url="http://x", sleep=mock.Mock())
+
+    def test_backoff_is_capped(self):
+        self.assertEqual(fetchers.backoff_delay(1, "3600"), fetchers.FETCH_BACKOFF_MAX)
+        for attempt in range(1, 20):
+            self.assertLessEqual(fetchers.backoff_delay(attempt), fetchers.FETCH_BACKOFF_MAX)
+
+
+class IterRandomUsersTests(SimpleTestCase):
+    def test_pages_cover_the_count(self):
+        self.assertEqual(fetchers.page_sizes(65, page_size=30), [30, 30, 5])
+        self.assertEqual(fetchers.page_sizes(0, page_size=30), [])
+
+    def test_yields_every_page(self):
+        def fake_fetch(session, count, url=None):
+            return [{"n": i} for i in range(count)]
+
+        with mock.patch.object(fetchers, "fetch_page", side_effect=fake_fetch) as fetch_page:
+            pages = list(fetchers.iter_random_users(65, url="http://x", concurrency=2, page_size=30))
+        self.assertEqual(sorted(len(page) for page in pages), [5, 30, 30])
+        self.assertEqual(fetch_page.call_count, 3)
+
+    def test_failure_propagates(self):
+        with mock.patch.object(fetchers, "fetch_page", side_effect=fetchers.FetchError("boom")):
+            with self.assertRaises(fetchers.FetchError):
+                list(fetchers.iter_random_users(100, url="http://x", concurrency=2, page_size=10))
@@ -0,0 +1,38 @@
+import io
+
+from django.test import SimpleTestCase
+
+from app.formats import detect_format, read_dataframe
+
+
+class DetectFormatTests(SimpleTestCase):
+    def test_detected_from_the_sample(self):
+        cases = {
+            b"id,name\n1,a\n2,b\n": "csv",
+            b"\xef\xbb\xbfid;name\n1;a\n2;b\n": "csv",
+            b"id\tname\n1\ta\n2\tb\n": "tsv",
+            b'[{"id": 1}, {"id": 2}]': "json",
+            b'{"id": 1}\n{"id": 2}\n': "ndjson",
+            b"<rows><row><id>1</id></row></rows>": "xml",
+        }
+        for payload, fmt in cases.items():
+            with self.subTest(fmt=fmt):
+                self.assertEqual(detect_format(payload), fmt)
+
+    def test_extension_beats_content_type_and_sample(self):
+        payload = b"id,name\n1,a\n"
+        self.assertEqual(detect_format(payload, filename="data.json?sig=x"), "json")
+        self.assertEqual(detect_format(payload, content_type="application/json; charset=utf-8"), "json")
+        self.assertEqual(
+            detect_format(payload, filename="data.csv", content_type="application/json"), "csv"
+        )
+
+    def test_file_position_is_kept(self):
+        f = io.BytesIO(b"id,name\n1,a\n")
+        self.assertEqual(detect_format(f), "csv")
+        self.assertEqual(f.tell(), 0)
+        self.assertEqual(list(read_dataframe(f, "csv")["name"]), ["a"])
+
+    def test_empty_payload(self):
+        with self.assertRaisesMessage(ValueError, "File contains no data"):
+            detect_format(b"")
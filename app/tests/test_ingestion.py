@@ -0,0 +1,65 @@
+from unittest import mock
+
+import pandas as pd
+from django.test import SimpleTestCase
+from sqlalchemy import Engine
+from sqlalchemy.dialects.mysql import pymysql
+from sqlalchemy.dialects.sqlite import pysqlite
+
+from app.ingestion import add_row_id
+from app.loaders import load_dataframe
+
+
+class AddRowIdTests(SimpleTestCase):
+    def test_table_name_is_quoted(self):
+        engine = mock.MagicMock(spec=Engine)
+        conn = engine.begin.return_value.__enter__.return_value
+        conn.dialect = pymysql.dialect()
+        with mock.patch("app.ingestion.inspect") as inspect:
+            inspect.return_value.get_pk_constraint.return_value = {"constrained_columns": []}
+            self.assertTrue(add_row_id(engine, "t`; DROP TABLE users; --"))
+
+        [statement] = conn.execute.call_args.args
+        self.assertEqual(
+            str(statement),
+            "ALTER TABLE `t``; DROP TABLE users; --` ADD COLUMN _row_id "
+            "BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST",
+        )
+
+    def test_table_with_a_key_is_left_alone(self):
+        conn = mock.MagicMock()
+        with mock.patch("app.ingestion.inspect") as inspect:
+            inspect.return_value.get_pk_constraint.return_value = {"constrained_columns": ["id"]}
+            self.assertFalse(add_row_id(conn, "t"))
+        conn.execute.assert_not_called()
+
+
+class LoadDataframeRowIdTests(SimpleTestCase):
+    df = pd.DataFrame({"name": ["a", "b"]})
+
+    def load(self, dialect, has_table):
+        conn = mock.MagicMock()
+        conn.dialect = dialect
+        with mock.patch("app.loaders.inspect") as inspect, \
+                mock.patch("app.ingestion.add_row_id") as add_row_id, \
+                mock.patch.object(pd.DataFrame, "to_sql") as to_sql:
+            inspect.return_value.has_table.return_value = has_table
+            load_dataframe(self.df, "random_users", conn, "to_sql")
+        return conn, add_row_id, to_sql
+
+    def test_new_mysql_table_gets_a_row_id(self):
+        conn, add_row_id, to_sql = self.load(pymysql.dialect(), has_table=False)
+        add_row_id.assert_called_once_with(conn, "random_users")
+        # Created empty first, then appended to
+        self.assertEqual(to_sql.call_count, 2)
+        self.assertEqual(to_sql.call_args.kwargs["if_exists"], "append")
+
+    def test_existing_mysql_table_is_appended_to(self):
+        _, add_row_id, to_sql = self.load(pymysql.dialect(), has_table=True)
+        add_row_id.assert_not_called()
+        to_sql.assert_called_once()
+
+    def test_other_dialects_are_left_to_pandas(self):
+        _, add_row_id, to_sql = self.load(pysqlite.dialect(), has_table=False)
+        add_row_id.assert_not_called()
+        to_sql.assert_called_once()
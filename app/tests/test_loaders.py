@@ -0,0 +1,37 @@
+from unittest import mock
+
+import pandas as pd
+from django.test import SimpleTestCase
+from sqlalchemy.dialects.mysql import pymysql
+
+from app.loaders import load_data_infile_loader, quote_identifier
+
+
+class LoadDataQuotingTests(SimpleTestCase):
+    """Names from uploaded headers and requests cannot break out of LOAD DATA."""
+
+    def run_loader(self, df, table_name):
+        conn = mock.Mock()
+        conn.dialect = pymysql.dialect()
+        with mock.patch.object(pd.DataFrame, "to_sql"):
+            load_data_infile_loader(df, table_name, conn)
+        statement, params = conn.execute.call_args.args
+        compiled = statement.compile(dialect=conn.dialect)
+        return str(compiled), set(compiled.params), params
+
+    def test_hostile_identifiers_are_quoted(self):
+        df = pd.DataFrame({"a`) ; DROP TABLE users; -- ": [1], "plain": [2], "x :y": [3]})
+        sql, bind_names, params = self.run_loader(df, "t` ; DROP TABLE users; --")
+
+        self.assertIn("INTO TABLE `t`` ; DROP TABLE users; --`", sql)
+        self.assertIn("(`a``) ; DROP TABLE users; -- `, plain, `x :y`)", sql)
+        # Only the file path is a bind parameter
+        self.assertEqual(bind_names, {"path"})
+        self.assertEqual(set(params), {"path"})
+
+    def test_quote_identifier(self):
+        conn = mock.Mock(dialect=pymysql.dialect())
+        self.assertEqual(quote_identifier(conn, "plain"), "plain")
+        self.assertEqual(quote_identifier(conn, "select"), "`select`")
+        self.assertEqual(quote_identifier(conn, "a`b"), "`a``b`")
+        self.assertEqual(quote_identifier(conn, 3), "`3`")
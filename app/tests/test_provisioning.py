@@ -0,0 +1,108 @@
+from django.test import TestCase
+
+from app import abac
+from app.models import Policy, User
+from app.provisioning import import_users
+from app.tests.helpers import CacheClearingMixin, client_for, make_user
+
+
+class BulkImportPermissionTests(CacheClearingMixin, TestCase):
+    def test_add_user_only_cannot_grant_flags(self):
+        manager = make_user("adder", can_add_user=True)
+        response = client_for(manager).post(
+            "/user-management/bulk/",
+            [
+                {"username": "plain", "password": "pw"},
+                {"username": "escalated", "password": "pw", "can_set_permissions": True, "can_add_user": "true"},
+            ],
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 1)
+        [error] = response.data["errors"]
+        self.assertEqual(error["username"], "escalated")
+        self.assertEqual(set(error["errors"]), {"can_set_permissions", "can_add_user"})
+        self.assertFalse(User.objects.filter(username="escalated").exists())
+        self.assertEqual(Policy.objects.get(user__username="plain").permission_bits, 0)
+
+    def test_set_permissions_caller_can_grant_flags(self):
+        manager = make_user("granter", can_add_user=True, can_set_permissions=True)
+        response = client_for(manager).post(
+            "/user-management/bulk/",
+            [{"username": "uploader", "password": "pw", "can_upload": True}],
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        policy = Policy.objects.get(user__username="uploader")
+        self.assertTrue(policy.can_upload)
+        self.assertEqual(policy.permission_bits, 1)
+
+    def test_caller_without_add_user_is_rejected(self):
+        response = client_for(make_user("nobody")).post(
+            "/user-management/bulk/", [{"username": "x", "password": "pw"}], format="json"
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_import_creates_memberships_and_reports_duplicates(self):
+        from app.models import Organization
+
+        org = Organization.objects.create(name="acme")
+        make_user("taken")
+        result = import_users([
+            {"username": "a", "password": "pw", "organization_ids": [org.id]},
+            {"username": "a", "password": "pw"},
+            {"username": "taken", "password": "pw"},
+            {"username": "b", "password": "pw", "organization_ids": [org.id + 1000]},
+        ])
+
+        self.assertEqual(result["created"], 1)
+        self.assertEqual([error["row"] for error in result["errors"]], [2, 3, 4])
+        user = User.objects.get(username="a")
+        self.assertEqual(list(user.organizations.all()), [org])
+        self.assertTrue(user.check_password("pw"))
+
+
+class BulkPolicyAssignmentTests(CacheClearingMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager = make_user("manager", can_set_permissions=True)
+        self.alice = make_user("alice", can_delete=True)
+        self.bob = make_user("bob")
+        Policy.objects.filter(user=self.bob).delete()
+
+    def post(self, user, entries):
+        return client_for(user).post("/user-permissions/bulk/", {"entries": entries}, format="json")
+
+    def test_applies_valid_entries_and_reports_the_rest(self):
+        self.assertFalse(abac.validate_permissions(self.alice, "read"))  # cache the old policy
+        response = self.post(self.manager, [
+            {"user_id": self.alice.id, "allowed_operations": ["read", "upload"]},
+            {"user_id": self.bob.id, "allowed_operations": ["read"]},
+            {"user_id": 999999, "allowed_operations": ["read"]},
+            {"user_id": self.alice.id, "allowed_operations": []},
+            {"user_id": self.bob.id, "allowed_operations": ["fly"]},
+            {"user_id": "1", "allowed_operations": ["read"]},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["updated"], response.data["created"]), (1, 1))
+        self.assertEqual([e["index"] for e in response.data["errors"]], [2, 3, 4, 5])
+
+        alice = Policy.objects.get(user=self.alice)
+        self.assertEqual((alice.can_read, alice.can_upload, alice.can_delete), (True, True, False))
+        self.assertEqual(alice.permission_bits, abac.permission_mask("read", "upload"))
+        self.assertEqual(Policy.objects.get(user=self.bob).permission_bits, abac.permission_mask("read"))
+        # bulk_update bypasses signals; the cached policy must still be dropped
+        self.assertTrue(abac.validate_permissions(self.alice, "read"))
+
+    def test_requires_set_permissions(self):
+        response = self.post(self.alice, [{"user_id": self.alice.id, "allowed_operations": ["read"]}])
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Policy.objects.get(user=self.alice).permission_bits, abac.permission_mask("delete"))
+
+    def test_bad_batches(self):
+        for entries in ([], None, [{}] * 1001):
+            with self.subTest(entries=type(entries).__name__):
+                self.assertEqual(self.post(self.manager, entries).status_code, 400)
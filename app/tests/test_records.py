@@ -0,0 +1,178 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from sqlalchemy import create_engine, text
+
+from app.records import RecordsError, fetch_page, forget_table
+from app.tests.helpers import CacheClearingMixin, client_for, make_user
+
+
+class KeysetPaginationTests(SimpleTestCase):
+    """fetch_page() walks every row exactly once, whatever the ordering."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.engine = create_engine(f"sqlite:///{os.path.join(cls.tmpdir.name, 'etl.sqlite3')}")
+        with cls.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, v INTEGER, name TEXT)"))
+            conn.execute(text("CREATE TABLE no_key (v INTEGER)"))
+            values = [3, 2, 1, None, None, None, 2, None, 5]
+            conn.execute(
+                text("INSERT INTO items (id, v, name) VALUES (:id, :v, :name)"),
+                [{"id": i, "v": v, "name": f"row {i}"} for i, v in enumerate(values, start=1)],
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        forget_table("items")
+        forget_table("no_key")
+        cls.engine.dispose()
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def walk(self, limit, **options):
+        pages, after = [], None
+        while True:
+            rows, after = fetch_page(self.engine, "items", limit=limit, after=after, **options)
+            pages.append([row["id"] for row in rows])
+            if after is None:
+                return pages
+            self.assertLess(len(pages), 20, "pagination does not terminate")
+
+    def expected(self, order_by):
+        with self.engine.connect() as conn:
+            return [row[0] for row in conn.execute(text(f"SELECT id FROM items ORDER BY {order_by}"))]
+
+    def test_descending_nullable_sort_visits_every_row_once(self):
+        for limit in (1, 2, 3, 4, 10):
+            with self.subTest(limit=limit):
+                pages = self.walk(limit, order_by="-v")
+                ids = [row_id for page in pages for row_id in page]
+                self.assertEqual(ids, self.expected("v DESC, id ASC"))
+
+    def test_ascending_nullable_sort_visits_every_row_once(self):
+        for limit in (1, 2, 3, 4, 10):
+            with self.subTest(limit=limit):
+                ids = [row_id for page in self.walk(limit, order_by="v") for row_id in page]
+                self.assertEqual(ids, self.expected("v ASC, id ASC"))
+
+    def test_filters_and_projection(self):
+        rows, after = fetch_page(
+            self.engine, "items", columns="name", filters=[("v__in", "1,2")], order_by="-id"
+        )
+        self.assertIsNone(after)
+        self.assertEqual(rows, [{"name": "row 7"}, {"name": "row 3"}, {"name": "row 2"}])
+
+    def test_token_from_another_ordering_is_rejected(self):
+        _, after = fetch_page(self.engine, "items", limit=2, order_by="v")
+        with self.assertRaises(RecordsError):
+            fetch_page(self.engine, "items", limit=2, after=after, order_by="-v")
+
+    def test_table_without_primary_key_is_rejected(self):
+        with self.assertRaises(RecordsError):
+            fetch_page(self.engine, "no_key")
+
+    def test_nested_column_names_are_rejected(self):
+        for spec in ([["name"]], ["name", 1], [{"name": 1}]):
+            with self.subTest(spec=spec):
+                with self.assertRaises(RecordsError):
+                    fetch_page(self.engine, "items", columns=spec)
+                with self.assertRaises(RecordsError):
+                    fetch_page(self.engine, "items", order_by=spec)
+
+
+class ExportTests(CacheClearingMixin, TestCase):
+    """?export= through DatabaseRecordsAPIView, on a sqlite ETL engine."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.engine = create_engine(f"sqlite:///{os.path.join(cls.tmpdir.name, 'etl.sqlite3')}")
+        with cls.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE people (id INTEGER PRIMARY KEY, name TEXT, age INTEGER)"))
+            conn.execute(
+                text("INSERT INTO people (id, name, age) VALUES (:id, :name, :age)"),
+                [{"id": i, "name": f"p{i}", "age": 20 + i} for i in range(1, 8)],
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        forget_table("people")
+        cls.engine.dispose()
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.client = client_for(make_user("reader", can_read=True))
+        patcher = mock.patch("app.views.get_engine", return_value=self.engine)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def export(self, method="get", **params):
+        params.setdefault("table_name", "people")
+        if method == "post":
+            return self.client.post("/database-records/", params, format="json")
+        return self.client.get("/database-records/", params)
+
+    def chunks(self, response):
+        self.assertEqual(response.status_code, 200, getattr(response, "data", None))
+        return list(response.streaming_content)
+
+    def test_ndjson(self):
+        response = self.export(export="ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertIn('filename="people.ndjson"', response["Content-Disposition"])
+        lines = b"".join(self.chunks(response)).decode().splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], list(range(1, 8)))
+        self.assertEqual(json.loads(lines[0]), {"id": 1, "name": "p1", "age": 21})
+
+    def test_csv_header_comes_first(self):
+        chunks = self.chunks(self.export(export="csv", columns="name,age"))
+        self.assertEqual(chunks[0], b"name,age\r\n")
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+        self.assertEqual(rows[0], ["name", "age"])
+        self.assertEqual(rows[1:], [[f"p{i}", str(20 + i)] for i in range(1, 8)])
+
+    def test_streamed_in_batches(self):
+        with mock.patch("app.records.EXPORT_BATCH_SIZE", 3):
+            ndjson = self.chunks(self.export(export="ndjson"))
+            csv_chunks = self.chunks(self.export(export="csv"))
+        self.assertEqual([chunk.count(b"\n") for chunk in ndjson], [3, 3, 1])
+        # Header, then one chunk per batch
+        self.assertEqual([chunk.count(b"\n") for chunk in csv_chunks], [1, 3, 3, 1])
+
+    def test_projection_filters_and_order(self):
+        response = self.export(
+            "post", export="ndjson", columns=["name"], filters={"age__gt": 23}, order_by="-age"
+        )
+        lines = b"".join(self.chunks(response)).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [{"name": f"p{i}"} for i in (7, 6, 5, 4)])
+
+    def test_bad_requests_fail_before_streaming(self):
+        cases = [
+            {"export": "xlsx"},
+            {"export": "csv", "columns": "nope"},
+            {"export": "csv", "age__gt": "old"},
+            {"export": "csv", "order_by": "nope"},
+        ]
+        for params in cases:
+            with self.subTest(params=params):
+                response = self.export(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.streaming)
+        response = self.export("post", export="ndjson", columns=[["name"]])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.export(export="csv", table_name="missing").status_code, 404)
+
+    def test_requires_read_permission(self):
+        self.client = client_for(make_user("nobody"))
+        self.assertEqual(self.export(export="csv").status_code, 403)
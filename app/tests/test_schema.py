@@ -0,0 +1,86 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.urls import clear_url_caches
+from drf_yasg import openapi
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+from app import schema
+from app.models import Policy
+from app.tests.helpers import CacheClearingMixin, client_for, make_user
+
+
+class SchemaCacheTests(CacheClearingMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        schema.clear_schema_cache()
+        self.addCleanup(schema.clear_schema_cache)
+        self.reader = make_user("reader", can_read=True)
+        self.uploader = make_user("uploader", can_upload=True)
+
+    def paths(self, user):
+        response = client_for(user).get("/swagger.json")
+        self.assertEqual(response.status_code, 200)
+        return set(response.json()["paths"])
+
+    def generator(self):
+        return schema.PermissionBasedSchemaGenerator(openapi.Info(title="t", default_version="v1"))
+
+    def request(self, user):
+        request = RequestFactory().get("/swagger.json")
+        request.user = user
+        return request
+
+    def test_users_with_different_features_get_different_schemas(self):
+        reader_paths = self.paths(self.reader)
+        uploader_paths = self.paths(self.uploader)
+        self.assertIn("/database-records/", reader_paths)
+        self.assertNotIn("/fetch-random-users/", reader_paths)
+        self.assertIn("/fetch-random-users/", uploader_paths)
+        self.assertNotIn("/database-records/", uploader_paths)
+        # Cached entries are not mixed up on the second round
+        self.assertEqual(self.paths(self.reader), reader_paths)
+        self.assertEqual(self.paths(self.uploader), uploader_paths)
+
+    def test_key_follows_the_allowed_features(self):
+        generator = self.generator()
+
+        def key(user, features):
+            with mock.patch("app.schema.get_allowed_features", return_value=features) as allowed:
+                key = generator._schema_cache_key(self.request(user), public=True)
+            allowed.assert_called_once_with(user)
+            return key
+
+        self.assertEqual(key(self.reader, ["a", "b"]), key(self.uploader, ["b", "a"]))
+        self.assertNotEqual(key(self.reader, ["a"]), key(self.reader, ["a", "b"]))
+        self.assertNotEqual(
+            generator._schema_cache_key(self.request(self.reader), public=True),
+            generator._schema_cache_key(self.request(self.uploader), public=True),
+        )
+
+    def test_schema_is_built_once_per_feature_set(self):
+        readers = [self.reader] + [make_user(f"reader{i}", can_read=True) for i in range(3)]
+        with mock.patch.object(OpenAPISchemaGenerator, "get_schema", return_value={}) as build:
+            generator = self.generator()
+            for user in readers * 2:
+                generator.get_schema(self.request(user), public=True)
+            self.assertEqual(build.call_count, 1)
+            generator.get_schema(self.request(self.uploader), public=True)
+            self.assertEqual(build.call_count, 2)
+
+    def test_policy_change_gives_a_new_schema(self):
+        self.assertNotIn("/fetch-random-users/", self.paths(self.reader))
+        policy = Policy.objects.get(user=self.reader)
+        policy.can_upload = True
+        policy.save()
+        self.assertIn("/fetch-random-users/", self.paths(self.reader))
+
+    def test_urlconf_change_drops_cached_schemas(self):
+        with mock.patch.object(OpenAPISchemaGenerator, "get_schema", return_value={}) as build:
+            generator = self.generator()
+            generator.get_schema(self.request(self.reader), public=True)
+            clear_url_caches()
+            generator.get_schema(self.request(self.reader), public=True)
+            self.assertEqual(build.call_count, 2)
+            self.assertEqual(len(schema._schemas), 1)
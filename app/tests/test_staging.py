@@ -0,0 +1,90 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from app import staging
+
+
+class StagingTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(staging, "STAGING_DIR", Path(tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def blobs(self):
+        return list((staging.STAGING_DIR / "objects").glob("*/*"))
+
+    def test_stage_open_release(self):
+        ref, checksum, size = staging.stage_stream([b"id,name\n", b"", b"1,a\n"])
+        self.assertEqual(checksum, hashlib.sha256(b"id,name\n1,a\n").hexdigest())
+        self.assertEqual(size, 12)
+        with open(staging.open_staged(ref, checksum), "rb") as f:
+            self.assertEqual(f.read(), b"id,name\n1,a\n")
+
+        staging.release(ref, checksum)
+        with self.assertRaises(staging.StagingError):
+            staging.open_staged(ref, checksum)
+        self.assertEqual(self.blobs(), [])
+
+    def test_identical_content_shares_a_blob_until_the_last_release(self):
+        first, checksum, _ = staging.stage_bytes(b"same")
+        second, _, _ = staging.stage_bytes(b"same")
+        self.assertEqual(len(self.blobs()), 1)
+
+        staging.release(first, checksum)
+        self.assertEqual(len(self.blobs()), 1)
+        staging.open_staged(second, checksum)
+
+        staging.release(second, checksum)
+        self.assertEqual(self.blobs(), [])
+
+    def test_release_racing_stage_keeps_the_new_claim(self):
+        first, checksum, _ = staging.stage_bytes(b"same")
+        real_replace = os.replace
+
+        def replace_then_release(src, dst):
+            real_replace(src, dst)
+            # Another worker finishes the first task right after the blob
+            # is published; the old inode is the only link it sees
+            staging.release(first, checksum)
+
+        with mock.patch.object(staging.os, "replace", replace_then_release):
+            second, _, _ = staging.stage_bytes(b"same")
+
+        with open(staging.open_staged(second, checksum), "rb") as f:
+            self.assertEqual(f.read(), b"same")
+        self.assertEqual(len(self.blobs()), 1)
+        staging.release(second, checksum)
+        self.assertEqual(self.blobs(), [])
+
+    def test_failed_stage_leaves_nothing_behind(self):
+        def chunks():
+            yield b"partial"
+            raise OSError("connection reset")
+
+        with self.assertRaises(OSError):
+            staging.stage_stream(chunks())
+        for name in ("tmp", "claims", "objects"):
+            self.assertEqual(list((staging.STAGING_DIR / name).rglob("*")), [], name)
+
+    def test_invalid_references_are_rejected(self):
+        with self.assertRaises(staging.StagingError):
+            staging.open_staged("../../etc/passwd", "0" * 64)
+        with self.assertRaises(staging.StagingError):
+            staging.release("0" * 32, "not-a-checksum")
+
+    def test_collect_garbage(self):
+        ref, checksum, _ = staging.stage_bytes(b"old")
+        claim = staging.STAGING_DIR / "claims" / ref
+        os.utime(claim, (0, 0))
+
+        removed = staging.collect_garbage(max_age=60, now=staging.STAGING_GRACE_PERIOD * 2)
+        self.assertEqual(removed["claims"], 1)
+        self.assertEqual(removed["blobs"], 1)
+        self.assertEqual(self.blobs(), [])
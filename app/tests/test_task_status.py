@@ -0,0 +1,139 @@
+import datetime
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from django_celery_results.models import TaskResult
+
+from app.models import TaskOwner
+from app.progress import record_task_owner
+from app.results import purge_results
+from app.tests.helpers import CacheClearingMixin, client_for, make_user
+
+
+def finished_task(task_id, owner=None, **fields):
+    TaskResult.objects.create(
+        task_id=task_id,
+        status="FAILURE",
+        result='{"exc_type": "ValueError", "exc_message": ["secret"], "exc_module": "builtins"}',
+        content_type="application/json",
+        content_encoding="utf-8",
+        traceback="Traceback (most recent call last): ...",
+        worker="celery@worker-1",
+        **fields,
+    )
+    if owner is not None:
+        record_task_owner(task_id, owner)
+
+
+class TaskStatusBatchTests(CacheClearingMixin, TestCase):
+    url = "/task-status/batch/"
+
+    def setUp(self):
+        super().setUp()
+        self.alice = make_user("alice")
+        self.bob = make_user("bob")
+        finished_task("alice-task", self.alice)
+        finished_task("bob-task", self.bob)
+
+    def test_anonymous_is_rejected(self):
+        response = client_for(None).post(
+            self.url, {"task_ids": ["alice-task"], "fields": ["traceback"]}, format="json"
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_only_own_tasks_are_reported(self):
+        response = client_for(self.alice).post(
+            self.url,
+            {"task_ids": ["alice-task", "bob-task", "unknown"], "fields": ["status", "traceback", "worker"]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        tasks = response.data["tasks"]
+        self.assertEqual(tasks["alice-task"]["status"], "FAILURE")
+        self.assertEqual(tasks["alice-task"]["worker"], "celery@worker-1")
+        # Someone else's task looks exactly like an unknown one
+        self.assertEqual(tasks["bob-task"], tasks["unknown"])
+        self.assertEqual(tasks["bob-task"], {"status": "PENDING", "traceback": None, "worker": None})
+
+    def test_purge_drops_owner_rows(self):
+        TaskResult.objects.update(date_done=timezone.now() - datetime.timedelta(days=30))
+        self.assertEqual(purge_results(retention=60), {"deleted": 2, "done": True})
+        self.assertFalse(TaskOwner.objects.exists())
+
+
+class TaskStatusAccessTests(CacheClearingMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = make_user("alice")
+        self.bob = make_user("bob")
+        finished_task("alice-task", self.alice)
+
+    def test_single_status_requires_authentication_and_ownership(self):
+        self.assertEqual(client_for(None).get("/task-status/alice-task/").status_code, 401)
+        self.assertEqual(client_for(self.bob).get("/task-status/alice-task/").status_code, 404)
+        response = client_for(self.alice).get("/task-status/alice-task/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], "FAILURE")
+
+    def test_events_require_authentication_and_ownership(self):
+        headers = {"HTTP_ACCEPT": "text/event-stream"}
+        self.assertEqual(client_for(None).get("/task-status/alice-task/events/", **headers).status_code, 401)
+        self.assertEqual(client_for(self.bob).get("/task-status/alice-task/events/", **headers).status_code, 404)
+
+    def test_events_stream_a_finished_task(self):
+        response = client_for(self.alice).get(
+            "/task-status/alice-task/events/", HTTP_ACCEPT="text/event-stream"
+        )
+        self.assertEqual(response.status_code, 200)
+        body = b"".join(response.streaming_content).decode()
+        response.close()
+        self.assertIn("event: finished", body)
+
+    def test_open_streams_per_user_are_capped(self):
+        from app import progress
+
+        client = client_for(self.alice)
+        with mock.patch.object(progress, "EVENTS_MAX_STREAMS_PER_USER", 2):
+            first = client.get("/task-status/alice-task/events/")
+            second = client.get("/task-status/alice-task/events/")
+            third = client.get("/task-status/alice-task/events/")
+            self.assertEqual([first.status_code, second.status_code, third.status_code], [200, 200, 429])
+
+            # Closing a stream, even one never read, gives its slot back
+            first.close()
+            fourth = client.get("/task-status/alice-task/events/")
+            self.assertEqual(fourth.status_code, 200)
+            second.close()
+            fourth.close()
+        self.assertEqual(cache.get("task-events:streams:%d" % self.alice.id), 0)
+
+
+class PublishFinishedTests(CacheClearingMixin, TestCase):
+    def events(self, task_id):
+        from app import progress
+
+        with mock.patch.object(progress, "EVENTS_MAX_DURATION", 0), \
+                mock.patch.object(progress, "EVENTS_BACKEND_INTERVAL", 3600):
+            return list(progress.iter_task_events(task_id))
+
+    def test_retry_is_not_finished(self):
+        from celery.exceptions import Retry
+
+        from app.progress import publish_finished, read_progress
+
+        publish_finished(task_id="t1", state="RETRY", retval=Retry("Audit queue full", when=5))
+        entry = read_progress("t1")
+        self.assertEqual((entry["state"], entry["stage"]), ("RETRY", "retrying"))
+        self.assertIn("Audit queue full", entry["reason"])
+
+        events = self.events("t1")
+        self.assertTrue(events[1].startswith("id: 1\nevent: progress\n"), events)
+        self.assertIn("event: timeout", events[-1])
+
+        publish_finished(task_id="t1", state="SUCCESS", retval={"status": "success"})
+        entry = read_progress("t1")
+        self.assertEqual((entry["stage"], entry["seq"]), ("finished", 2))
+        self.assertIn("event: finished", self.events("t1")[-1])
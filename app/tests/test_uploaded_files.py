@@ -0,0 +1,76 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from app.models import Organization, UploadedFile
+from app.pagination import encode_cursor
+from app.tests.helpers import CacheClearingMixin, client_for, make_user
+
+
+class UploadedFileListTests(CacheClearingMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.acme = Organization.objects.create(name="acme")
+        self.globex = Organization.objects.create(name="globex")
+        self.reader = make_user("reader", organizations=[self.acme], can_read=True)
+        self.colleague = make_user("colleague", organizations=[self.acme, self.globex])
+        self.outsider = make_user("outsider", organizations=[self.globex])
+
+        # Several files share a timestamp so pages break inside a tie
+        base = timezone.now().replace(microsecond=123456)
+        stamps = [base, base, base, base - datetime.timedelta(seconds=1), base]
+        self.files = []
+        for i, uploaded_at in enumerate(stamps):
+            owner = self.reader if i % 2 else self.colleague
+            f = UploadedFile.objects.create(user=owner, filename=f"f{i}.csv", table_name="uploads")
+            UploadedFile.objects.filter(pk=f.pk).update(uploaded_at=uploaded_at)
+            self.files.append(f.pk)
+        UploadedFile.objects.create(user=self.outsider, filename="hidden.csv", table_name="uploads")
+        UploadedFile.objects.create(user=self.reader, filename="other.csv", table_name="other")
+
+        self.client = client_for(self.reader)
+
+    def walk(self, **params):
+        ids, after = [], None
+        while True:
+            query = dict(params, **({"after": after} if after else {}))
+            response = self.client.get("/uploaded-files/", query)
+            self.assertEqual(response.status_code, 200, response.content)
+            ids.extend(f["id"] for f in response.data["results"])
+            after = response.data["next"]
+            if after is None:
+                return ids
+
+    def test_every_file_once_newest_first(self):
+        expected = list(
+            UploadedFile.objects.filter(table_name="uploads", user__organizations=self.acme)
+            .distinct().order_by("-uploaded_at", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(sorted(expected), sorted(self.files))
+        for limit in (1, 2, 3, 100):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.walk(limit=limit, table_name="uploads"), expected)
+
+    def test_rows_are_not_repeated_per_membership(self):
+        response = self.client.get("/uploaded-files/", {"table_name": "uploads"})
+        ids = [f["id"] for f in response.data["results"]]
+        self.assertEqual(len(ids), len(set(ids)))
+        colleague_file = next(
+            f for f in response.data["results"] if f["user__username"] == "colleague"
+        )
+        self.assertEqual(colleague_file["user__organizations"], ["acme", "globex"])
+
+    def test_bad_parameters(self):
+        for params in (
+            {"limit": "0"},
+            {"limit": "many"},
+            {"after": "garbage"},
+            {"after": encode_cursor("database-records", ["2026-01-01T00:00:00", 1])},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get("/uploaded-files/", params).status_code, 400)
+
+    def test_requires_read_permission(self):
+        self.assertEqual(client_for(self.outsider).get("/uploaded-files/").status_code, 403)
+        self.assertEqual(client_for(None).get("/uploaded-files/").status_code, 401)
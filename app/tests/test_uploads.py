@@ -0,0 +1,91 @@
+import io
+from unittest import mock
+
+from django.test import TestCase
+
+from app.models import TaskOwner
+from app.staging import release
+from app.tests.helpers import CacheClearingMixin, client_for, make_user
+
+
+class FakeDownload(io.BytesIO):
+    headers = {"Content-Type": "text/csv"}
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        yield self.getvalue()
+
+
+class URLUploadValidationTests(CacheClearingMixin, TestCase):
+    url = "/upload-url/"
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("uploader", can_upload=True)
+        self.client = client_for(self.user)
+
+    def post(self, data, format=None):
+        """POST /upload-url/ with the download and the broker mocked; returns (response, task kwargs)."""
+        with mock.patch("app.views.requests.get", return_value=FakeDownload(b"a,b\n1,2\n")), \
+                mock.patch("app.tasks.process_upload_task.apply_async") as apply_async:
+            apply_async.return_value.id = "task-1"
+            response = self.client.post(self.url, data, format=format)
+        kwargs = apply_async.call_args.kwargs["kwargs"] if apply_async.called else None
+        if kwargs:
+            self.addCleanup(release, kwargs["staged_ref"], kwargs["checksum"])
+        return response, kwargs
+
+    def test_form_encoded_values_are_converted(self):
+        response, kwargs = self.post(
+            {"url": "https://example.com/data.csv", "stream": "false", "chunk_size": "300"}
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertIs(kwargs["stream"], False)
+        self.assertEqual(kwargs["chunk_size"], 300)
+        self.assertEqual(kwargs["table_name"], "uploaded_data")
+        self.assertTrue(TaskOwner.objects.filter(task_id="task-1", user=self.user).exists())
+
+    def test_omitted_stream_stays_automatic(self):
+        for format in (None, "json"):
+            with self.subTest(format=format):
+                response, kwargs = self.post({"url": "https://example.com/data.csv"}, format=format)
+                self.assertEqual(response.status_code, 202)
+                self.assertIsNone(kwargs["stream"])
+                self.assertIsNone(kwargs["chunk_size"])
+
+    def test_invalid_values_are_rejected_before_download(self):
+        for data in (
+            {"url": "https://example.com/data.csv", "chunk_size": "0"},
+            {"url": "https://example.com/data.csv", "chunk_size": "many"},
+            {"url": "https://example.com/data.csv", "stream": "perhaps"},
+            {"url": "not a url"},
+            {},
+        ):
+            with self.subTest(data=data):
+                response, kwargs = self.post(data)
+                self.assertEqual(response.status_code, 400)
+                self.assertIsNone(kwargs)
+
+    def test_loader_must_be_a_registered_name(self):
+        response, kwargs = self.post(
+            {"url": "https://example.com/data.csv", "loader": "multirow"}, format="json"
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(kwargs["loader"], "multirow")
+
+        for loader in (["to_sql"], "bulk", {"name": "to_sql"}):
+            with self.subTest(loader=loader):
+                response, kwargs = self.post(
+                    {"url": "https://example.com/data.csv", "loader": loader}, format="json"
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("loader", response.data)
+                self.assertIsNone(kwargs)
+
+    def test_get_loader_rejects_unhashable_names(self):
+        from app.loaders import get_loader
+
+        with self.assertRaises(ValueError):
+            get_loader(["to_sql"])
@@ -1,16 +1,24 @@
 from django.urls import path
-from .views import FileUploadAPIView, FetchRandomUsersAPIView, TaskStatusAPIView, RegisterAPIView, LoginAPIView, MeAPIView, UserFeaturesAPIView, UploadedFileListAPIView, DatabaseRecordsAPIView, UserManagementAPIView, UserPermissionsAPIView # Import UserManagementAPIView and UserPermissionsAPIView
+from .views import FileUploadAPIView, URLFileUploadAPIView, FetchRandomUsersAPIView, TaskStatusAPIView, TaskStatusBatchAPIView, TaskEventsAPIView, RegisterAPIView, LoginAPIView, MeAPIView, UserFeaturesAPIView, UploadedFileListAPIView, DatabaseRecordsAPIView, UserManagementAPIView, UserBulkImportAPIView, UserPermissionsAPIView, UserPermissionsBulkAPIView, DatabasePoolStatsAPIView, CacheStatsAPIView, PermissionEvaluationAPIView # Import UserManagementAPIView and UserPermissionsAPIView
 
 urlpatterns = [
     path("register/", RegisterAPIView.as_view(), name="register"),
     path("login/", LoginAPIView.as_view(), name="login"),
     path("upload/", FileUploadAPIView.as_view(), name="file-upload"),
+    path("upload-url/", URLFileUploadAPIView.as_view(), name="file-upload-url"),
     path("fetch-random-users/", FetchRandomUsersAPIView.as_view(), name="fetch-random-users"),
+    path("task-status/batch/", TaskStatusBatchAPIView.as_view(), name="task-status-batch"),
     path("task-status/<str:task_id>/", TaskStatusAPIView.as_view(), name="task-status"),
+    path("task-status/<str:task_id>/events/", TaskEventsAPIView.as_view(), name="task-events"),
     path("me/", MeAPIView.as_view(), name="me"),
     path("my-features/", UserFeaturesAPIView.as_view(), name="my-features"),
     path("uploaded-files/", UploadedFileListAPIView.as_view(), name="uploaded-files"),
     path("database-records/", DatabaseRecordsAPIView.as_view(), name="database-records"),  # New endpoint
     path("user-management/", UserManagementAPIView.as_view(), name="user-management"),  # Manager user management actions
+    path("user-management/bulk/", UserBulkImportAPIView.as_view(), name="user-management-bulk"),
     path("user-permissions/", UserPermissionsAPIView.as_view(), name="user-permissions"),  # New endpoint for user permissions
+    path("user-permissions/bulk/", UserPermissionsBulkAPIView.as_view(), name="user-permissions-bulk"),
+    path("db-pool-stats/", DatabasePoolStatsAPIView.as_view(), name="db-pool-stats"),
+    path("cache-stats/", CacheStatsAPIView.as_view(), name="cache-stats"),
+    path("permissions/evaluate/", PermissionEvaluationAPIView.as_view(), name="permissions-evaluate"),
 ]
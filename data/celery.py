@@ -1,6 +1,12 @@
 from __future__ import annotations
 import os
 from celery import Celery
+from celery.signals import (
+    celeryd_after_setup,
+    celeryd_init,
+    worker_process_init,
+    worker_process_shutdown,
+)
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'data.settings')
 
@@ -8,3 +14,63 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'data.settings')
 app = Celery('data')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def init_worker_engine(**kwargs):
+    # Each forked worker child drops the pool it inherited from the parent
+    # (without closing the parent's sockets) and opens its own.
+    from app.audit import reset_audit_writer
+    from app.db import dispose_engines, get_engine, start_pool_stats_logging
+
+    dispose_engines(close=False)
+    get_engine()
+    reset_audit_writer()
+    # The reporter thread of the parent did not survive the fork
+    start_pool_stats_logging()
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_engine(**kwargs):
+    from app.audit import close_audit_writer
+    from app.db import dispose_engines, stop_pool_stats_logging
+
+    stop_pool_stats_logging()
+    # Buffered audit events need the engine, so flush them first
+    close_audit_writer()
+    dispose_engines()
+
+
+def _worker_profile():
+    """The ETL_WORKER_PROFILE this worker runs as (settings.ETL_WORKER_PROFILES), or None."""
+    from django.conf import settings
+
+    name = os.environ.get('ETL_WORKER_PROFILE')
+    if not name:
+        return None
+    profiles = getattr(settings, 'ETL_WORKER_PROFILES', {})
+    if name not in profiles:
+        raise ValueError(
+            f"Unknown ETL_WORKER_PROFILE '{name}'. Choose one of: {', '.join(profiles)}"
+        )
+    return profiles[name]
+
+
+@celeryd_init.connect
+def apply_worker_profile(conf=None, **kwargs):
+    # Runs before the worker reads its settings; command-line options win
+    profile = _worker_profile()
+    if profile:
+        conf.worker_concurrency = profile.get('concurrency', conf.worker_concurrency)
+        conf.worker_prefetch_multiplier = profile.get(
+            'prefetch_multiplier', conf.worker_prefetch_multiplier
+        )
+
+
+@celeryd_after_setup.connect
+def select_profile_queues(sender, instance, **kwargs):
+    profile = _worker_profile()
+    queues = instance.app.amqp.queues
+    # consume_from is the full queue set itself unless -Q already selected some
+    if profile and profile.get('queues') and queues.consume_from is queues:
+        queues.select(profile['queues'])
@@ -11,8 +11,11 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 """
 
+import os
 from pathlib import Path
 
+from kombu import Queue
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -51,7 +54,7 @@ REST_FRAMEWORK = {
         "rest_framework.renderers.BrowsableAPIRenderer",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "app.authentication.CachedTokenAuthentication",
     ],
 }
 
@@ -61,6 +64,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app.middleware.ABACRequestCacheMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -98,6 +102,30 @@ DATABASES = {
 }
 
 
+# Cache shared by web and worker processes (ABAC policy cache, ...).
+# Set REDIS_URL in production. The local-memory fallback is per process:
+# with it, authorization data (ABAC policies, memberships, token lookups)
+# is only cached per request, since an invalidation could not reach the
+# other processes (check app.W001 warns about it).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+ABAC_POLICY_CACHE_TIMEOUT = 300  # seconds; entries are also invalidated on change
+ETL_SHARED_CACHE = None  # None: detect from the backend; True/False to override
+ETL_AUTH_TOKEN_CACHE_TIMEOUT = 60  # seconds a token -> user id lookup is cached (app.authentication)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -148,8 +176,111 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_RESULT_BACKEND = 'django-db'
+# Results are expired by purge-task-results below (bounded batches) instead
+# of Celery's built-in backend_cleanup, which deletes them in one statement
+CELERY_RESULT_EXPIRES = None
+CELERY_BEAT_SCHEDULE = {
+    'purge-staged-files': {
+        'task': 'app.tasks.purge_staged_files_task',
+        'schedule': 60 * 60,
+    },
+    'purge-task-results': {
+        'task': 'app.tasks.purge_task_results_task',
+        'schedule': 15 * 60,
+    },
+    # No-op unless ETL_RANDOM_USER_RESERVOIR_ENABLED
+    'refill-random-user-reservoir': {
+        'task': 'app.tasks.refill_random_user_reservoir_task',
+        'schedule': 60,
+    },
+}
+
+# Queues: heavy ingestion, external API fetches and millisecond-scale
+# logging never wait behind each other. Priorities (0-9, higher first) need
+# x-max-priority on the RabbitMQ queue; the default 'celery' queue keeps
+# its existing declaration.
+CELERY_TASK_DEFAULT_QUEUE = 'celery'
+CELERY_TASK_DEFAULT_PRIORITY = 5
+CELERY_TASK_QUEUES = (
+    Queue('celery', routing_key='celery'),
+    Queue('ingest', routing_key='ingest', queue_arguments={'x-max-priority': 10}),
+    Queue('api_fetch', routing_key='api_fetch', queue_arguments={'x-max-priority': 10}),
+    Queue('logging', routing_key='logging', queue_arguments={'x-max-priority': 10}),
+)
+CELERY_TASK_ROUTES = {
+    'app.tasks.process_upload_task': {'queue': 'ingest'},
+    'app.tasks.fetch_random_users_task': {'queue': 'api_fetch'},
+    'app.tasks.refill_random_user_reservoir_task': {'queue': 'api_fetch', 'priority': 2},
+    'app.tasks.log_file_upload_task': {'queue': 'logging', 'priority': 8},
+}
+# Worker profiles, picked with ETL_WORKER_PROFILE=<name> when starting
+# `celery -A data worker` (see data/celery.py). -Q/-c/--prefetch-multiplier
+# on the command line still win. Without a profile a worker consumes every
+# queue with Celery's defaults.
+ETL_WORKER_PROFILES = {
+    # Long, memory-heavy tasks: few processes, no prefetching behind a big upload
+    'ingest': {'queues': ['ingest'], 'concurrency': 2, 'prefetch_multiplier': 1},
+    # Network-bound: many processes, moderate prefetch
+    'api_fetch': {'queues': ['api_fetch'], 'concurrency': 8, 'prefetch_multiplier': 4},
+    # Tiny tasks (and periodic maintenance): prefetch generously
+    'logging': {'queues': ['logging', 'celery'], 'concurrency': 4, 'prefetch_multiplier': 16},
+}
 AUTH_USER_MODEL = 'app.User'
 
+# ETL ingestion settings
+# Upload staging area (claim-check). Must be reachable by both the web and
+# worker processes.
+ETL_STAGING_DIR = BASE_DIR / 'staging'
+ETL_STAGING_MAX_AGE = 24 * 60 * 60  # seconds before an unprocessed upload is collected
+# Pooled SQLAlchemy engine for the ETL database (per web/worker process, see app.db)
+ETL_DB_POOL_SIZE = 5
+ETL_DB_MAX_OVERFLOW = 10
+ETL_DB_POOL_TIMEOUT = 30  # seconds to wait for a free connection
+ETL_DB_POOL_RECYCLE = 1800  # seconds; keep below MySQL wait_timeout
+ETL_DB_POOL_STATS_LOG_INTERVAL = 60  # seconds between pool stats log lines per worker process (0: off)
+# /database-records/ page size (keyset pagination)
+ETL_RECORDS_PAGE_SIZE = 1000
+ETL_RECORDS_MAX_PAGE_SIZE = 10000
+ETL_EXPORT_BATCH_SIZE = 5000  # rows per streamed batch for export=ndjson|csv
+# /uploaded-files/ page size (cursor pagination, newest first)
+ETL_UPLOADED_FILES_PAGE_SIZE = 100
+ETL_UPLOADED_FILES_MAX_PAGE_SIZE = 1000
+# Task progress (app.progress): cache entries, backend writes, SSE stream
+ETL_TASK_PROGRESS_TTL = 3600
+ETL_TASK_PROGRESS_STATE_INTERVAL = 5  # min seconds between PROGRESS writes to django-db
+ETL_TASK_EVENTS_MAX_DURATION = 300  # seconds before an SSE stream asks the client to reconnect
+ETL_TASK_EVENTS_MAX_STREAMS_PER_USER = 3  # concurrent SSE streams per user (each holds a web worker)
+# Random-user API fetcher (app.fetchers); point the URL at a stub server for tests
+ETL_RANDOM_USER_API_URL = os.environ.get('RANDOM_USER_API_URL', 'https://api.api-ninjas.com/v2/randomuser')
+ETL_RANDOM_USER_PAGE_SIZE = 30  # users per upstream request
+ETL_RANDOM_USER_MAX_COUNT = 10000  # users per fetch-random-users request
+ETL_FETCH_CONCURRENCY = 4  # upstream requests in flight per task
+ETL_FETCH_MAX_ATTEMPTS = 5  # per page, retrying 429/5xx with jittered backoff
+# Pre-fetched random-user reservoir (app.reservoir), topped up by celery beat.
+# Needs DATABASES['default'] and the ETL database (ETL_DB_URL / MYSQL_* env)
+# to be the same database; the reservoir tasks check this at runtime.
+ETL_RANDOM_USER_RESERVOIR_ENABLED = os.environ.get('RANDOM_USER_RESERVOIR', '') == '1'
+ETL_RANDOM_USER_RESERVOIR_TARGET = 1000  # users kept ready
+ETL_RANDOM_USER_RESERVOIR_MOVE_BATCH = 1000  # users moved to random_users per transaction
+# Buffered file_upload_log writer (app.audit), per worker process
+ETL_AUDIT_BATCH_SIZE = 500  # events per multi-row INSERT
+ETL_AUDIT_FLUSH_INTERVAL = 2.0  # max seconds an event waits in the buffer
+ETL_AUDIT_QUEUE_SIZE = 10000  # buffered events before producers block
+ETL_AUDIT_PUT_TIMEOUT = 5.0  # seconds a producer blocks on a full buffer
+# Task results in the django-db backend (app.results)
+ETL_TASK_RESULT_RETENTION = 7 * 24 * 60 * 60  # seconds a finished result is kept
+ETL_TASK_RESULT_PURGE_BATCH_SIZE = 1000  # rows per DELETE
+ETL_TASK_RESULT_PURGE_MAX_BATCHES = 50  # DELETEs per purge run
+ETL_TASK_RESULT_ARCHIVE_DIR = None  # e.g. BASE_DIR / 'task_results' / 'archive' to keep purged rows
+ETL_TASK_RESULT_MAX_BYTES = 16 * 1024  # larger results are stored in ETL_TASK_RESULT_DIR
+ETL_TASK_RESULT_DIR = BASE_DIR / 'task_results'
+# Bulk user import (/user-management/bulk/, manage.py import_users)
+ETL_USER_IMPORT_MAX_ROWS = 10000
+ETL_PASSWORD_HASH_WORKERS = None  # processes hashing passwords; None = one per CPU
+# Load backend when an upload does not pick one: to_sql, multirow or load_data
+# (load_data needs local_infile=ON on the MySQL server)
+ETL_DEFAULT_LOADER = 'to_sql'
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         'Token': {
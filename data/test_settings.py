@@ -0,0 +1,35 @@
+"""
+Settings for the test suite: python manage.py test --settings=data.test_settings
+
+Same as data.settings, but on SQLite and a local-memory cache so the tests
+need neither MySQL, Redis nor RabbitMQ.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_db.sqlite3',
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+# The test runner is one process, so the local-memory cache is as good as
+# a shared one for the authorization caches
+ETL_SHARED_CACHE = True
+
+# Fast hashing; the default hasher is deliberately slow
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+ALLOWED_HOSTS = ['testserver', 'localhost']
+
+ETL_STAGING_DIR = BASE_DIR / 'staging' / 'test'
+ETL_TASK_RESULT_DIR = BASE_DIR / 'task_results' / 'test'
+
+# ETL tables (uploads, records, exports) live in their own SQLite file
+ETL_DB_URL = f"sqlite:///{BASE_DIR / 'test_etl.sqlite3'}"